@@ -35,6 +35,11 @@
         'data/sequence_data.xml',
         'data/activity_type_data.xml',
         'data/cron_data.xml',
+        'data/shelf_life_rule_data.xml',
+        'data/reception_daily_summary_data.xml',
+        'data/pest_trap_station_data.xml',
+        'data/pest_hotspot_data.xml',
+        'data/compliance_fact_data.xml',
         'views/quality_control_views.xml',
         'views/vegetable_pallet_views.xml',
         'views/pediluvios_views.xml',
@@ -42,8 +47,22 @@
         'views/pest_control_detail_views.xml',
         'views/recurring_task_views.xml',
         'views/dashboard_views.xml',
+        'views/shelf_life_rule_views.xml',
+        'views/spc_chart_views.xml',
+        'views/reception_daily_summary_views.xml',
+        'views/pest_trap_station_views.xml',
+        'views/pest_consumption_views.xml',
+        'views/pest_hotspot_views.xml',
+        'views/compliance_fact_views.xml',
+        'views/audit_pack_views.xml',
+        'views/audit_log_views.xml',
+        'views/audit_trail_views.xml',
+        'views/offline_sync_views.xml',
+        'views/temperature_probe_views.xml',
+        'reports/pest_consumption_report.xml',
         'views/quality_control_menu.xml',
         'views/raw_material_reception_views.xml',
+        'reports/report_layout.xml',
         'reports/quality_control_report.xml',
         'reports/vegetable_pallet_report.xml',
         'reports/pediluvios_report.xml',
@@ -64,6 +83,9 @@
             'kani_factory_quality_control/static/src/css/activity_icons.css',
             'kani_factory_quality_control/static/src/js/systray_notifications.js',
         ],
+        'web.report_assets_common': [
+            'kani_factory_quality_control/static/src/css/report_styles.css',
+        ],
     },
     'installable': True,
     'application': True,
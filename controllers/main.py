@@ -0,0 +1,60 @@
+import json
+
+from odoo import api, http
+from odoo.exceptions import UserError
+from odoo.http import request, content_disposition
+from odoo.tools import consteq
+
+
+class QualityControlAuditController(http.Controller):
+
+    @http.route('/quality_control/audit_pack/<int:pack_id>/zip', type='http', auth='user')
+    def audit_pack_zip(self, pack_id, **kwargs):
+        """Descargar en streaming el ZIP de PDFs de un paquete de auditoría"""
+        pack = request.env['quality.control.audit.pack'].browse(pack_id).exists()
+        if not pack:
+            raise request.not_found()
+        pack.check_access_rule('read')
+        filename = pack._get_zip_filename()
+        registry, uid, context = request.env.registry, request.env.uid, dict(request.env.context)
+
+        def generate():
+            # El cursor de la petición se cierra antes de enviar la respuesta
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                yield from env['quality.control.audit.pack'].browse(pack_id)._iter_zip_export()
+
+        return request.make_response(generate(), headers=[
+            ('Content-Type', 'application/zip'),
+            ('Content-Disposition', content_disposition(filename)),
+        ])
+
+
+class QualityControlSyncController(http.Controller):
+
+    @http.route('/quality_control/sync', type='json', auth='user', methods=['POST'])
+    def sync(self, records, batch_ref=None, **kwargs):
+        """Sincronizar en una sola transacción los formularios capturados sin conexión en una tableta"""
+        return request.env['quality.control.sync.record']._apply_batch(records, batch_ref=batch_ref)
+
+
+class QualityControlProbeController(http.Controller):
+
+    @http.route('/quality_control/probes/ingest', type='http', auth='public', methods=['POST'], csrf=False)
+    def ingest(self, **kwargs):
+        """Recibir un lote de lecturas de sondas: ``{"readings": [{"probe", "timestamp", "temperature"}]}``.
+
+        Las pasarelas se autentican con ``Authorization: Bearer <token>``, el
+        valor del parámetro ``kani_factory_quality_control.probe_ingest_token``.
+        """
+        Probe = request.env['quality.control.temperature.probe'].sudo()
+        token = Probe._get_ingest_token()
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if not token or not consteq(authorization, 'Bearer %s' % token):
+            return request.make_json_response({'error': 'unauthorized'}, status=401)
+        try:
+            payload = json.loads(request.httprequest.get_data())
+            result = Probe._ingest_readings(payload['readings'])
+        except (ValueError, KeyError, TypeError, UserError) as error:
+            return request.make_json_response({'error': str(error)}, status=400)
+        return request.make_json_response(result)
\ No newline at end of file
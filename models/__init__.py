@@ -1,5 +1,23 @@
+from . import compliance_fact
+from . import report_cache
+from . import audit_log
+from . import audit_trail
+from . import archive
+from . import text_search
 from . import quality_control
 from . import recurring_task
+from . import pest_trap_station
 from . import pest_control
 from . import pest_control_detail
-from . import raw_material_reception
\ No newline at end of file
+from . import pest_hotspot
+from . import reception_daily_summary
+from . import raw_material_reception
+from . import raw_material_reception_report
+from . import pest_consumption_report
+from . import ir_actions_report
+from . import report_benchmark
+from . import shelf_life_rule
+from . import spc_chart
+from . import audit_pack
+from . import offline_sync
+from . import temperature_probe
\ No newline at end of file
@@ -0,0 +1,105 @@
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+from odoo.tools import create_index
+
+from .audit_log import BULK_ENTRY_CONTEXT_KEY
+from .compliance_fact import COMPLIANCE_MODELS, FINAL_STATES
+
+_logger = logging.getLogger(__name__)
+
+
+class QualityControlArchiveMixin(models.AbstractModel):
+    _name = 'quality.control.archive.mixin'
+    _description = 'Archivo de Controles Cerrados'
+
+    # Fecha que define la antigüedad del control (y el orden de sus vistas de lista)
+    _archive_date_field = 'control_date'
+    _responsible_field = 'responsible_id'
+
+    active = fields.Boolean(string='Activo', default=True)
+
+    def init(self):
+        super().init()
+        if self._abstract:
+            return
+        for suffix, expressions, where in self._get_search_indexes():
+            create_index(self._cr, '%s_%s_index' % (self._table, suffix), self._table, expressions, where=where)
+
+    def _get_search_indexes(self):
+        """Índices de los filtros y ordenamientos de las vistas de búsqueda: (sufijo, expresiones, where).
+
+        Los sufijos son cortos para que los nombres no superen los 63 caracteres de PostgreSQL.
+        """
+        date = self._archive_date_field
+        final_states = ', '.join("'%s'" % state for state in FINAL_STATES)
+        return [
+            # Camino caliente: solo controles activos, en el orden de la vista de lista
+            ('hot', ['%s DESC' % date], 'active IS TRUE'),
+            ('state_date', ['state', date], ''),
+            ('resp_state', [self._responsible_field, 'state'], ''),
+            ('sup_state', ['supervisor_id', 'state'], ''),
+            # Controles abiertos ("Borrador", "En Progreso", "Por Supervisar")
+            ('open', ['%s DESC' % date], 'state NOT IN (%s)' % final_states),
+        ]
+
+    @api.model
+    def _get_index_usage(self):
+        """Uso de los índices de las tablas de control según pg_stat_user_indexes.
+
+        Devuelve una fila por índice (tabla, índice, escaneos, tuplas leídas y
+        tamaño) ordenada de menor a mayor uso, y deja en el log los índices que
+        nunca se han usado desde el último reinicio de estadísticas.
+        """
+        tables = tuple(self.env[model_name]._table for model_name, _label in COMPLIANCE_MODELS) + (
+            self.env['quality.control.pest.control.line']._table,
+        )
+        self.env.cr.execute("""
+            SELECT relname AS table_name,
+                   indexrelname AS index_name,
+                   idx_scan AS scans,
+                   idx_tup_read AS tuples_read,
+                   idx_tup_fetch AS tuples_fetched,
+                   pg_size_pretty(pg_relation_size(indexrelid)) AS size
+              FROM pg_stat_user_indexes
+             WHERE relname IN %s
+          ORDER BY idx_scan, relname, indexrelname
+        """, [tables])
+        usage = self.env.cr.dictfetchall()
+        for row in usage:
+            if not row['scans']:
+                _logger.info("Índice sin uso: %s.%s (%s)", row['table_name'], row['index_name'], row['size'])
+        return usage
+
+    @api.model
+    def _get_archive_retention_days(self):
+        """Antigüedad en días a partir de la cual se archivan los controles cerrados (parámetro del sistema)"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'kani_factory_quality_control.archive_retention_days', 730
+        ))
+
+    @api.model
+    def _get_archive_domain(self, cutoff):
+        return [('state', 'in', FINAL_STATES), (self._archive_date_field, '<', cutoff)]
+
+    @api.model
+    def _cron_archive_closed_controls(self, batch_size=1000):
+        """Archivar por lotes los controles cerrados más antiguos que el horizonte de retención.
+
+        Los controles archivados salen de las listas, búsquedas y ordenamientos
+        por defecto, pero se siguen abriendo por id, con el filtro "Archivados",
+        desde la tabla de cumplimiento, la trazabilidad y los paquetes de auditoría.
+        """
+        cutoff = fields.Date.context_today(self) - timedelta(days=self._get_archive_retention_days())
+        context = {BULK_ENTRY_CONTEXT_KEY: _('Archivo de controles anteriores a %s') % cutoff}
+        for model_name, _label in COMPLIANCE_MODELS:
+            Model = self.env[model_name].with_context(**context)
+            domain = Model._get_archive_domain(cutoff)
+            while True:
+                records = Model.search(domain, limit=batch_size)
+                if not records:
+                    break
+                records.write({'active': False})
+                self.env.cr.commit()
+                self.env.invalidate_all()
\ No newline at end of file
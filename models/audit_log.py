@@ -0,0 +1,165 @@
+import json
+
+from odoo import models, fields, api, _
+
+from .compliance_fact import COMPLIANCE_MODELS
+
+
+# Clave de contexto que activa el modo de carga masiva; su valor (texto) identifica el lote
+BULK_ENTRY_CONTEXT_KEY = 'quality_bulk_entry'
+
+
+class QualityControlAuditMixin(models.AbstractModel):
+    _name = 'quality.control.audit.mixin'
+    _description = 'Auditoría de Controles de Calidad'
+
+    # Debe heredarse antes de mail.thread: en modo de carga masiva desactiva el seguimiento
+    # campo a campo y deja un resumen por lote; fuera de él, cada cambio va al historial
+
+    def _is_bulk_entry(self):
+        return bool(self.env.context.get(BULK_ENTRY_CONTEXT_KEY) or self.env.context.get('import_file'))
+
+    def _get_audit_fields(self, field_names):
+        """Campos almacenados (sin x2many) cuyo cambio se registra en el historial"""
+        return [
+            name for name in field_names
+            if name in self._fields and self._fields[name].store
+            and self._fields[name].type not in ('one2many', 'many2many')
+        ]
+
+    def _snapshot_audit_values(self, field_names):
+        return {
+            record.id: {
+                name: record[name].id if isinstance(record[name], models.BaseModel) else record[name]
+                for name in field_names
+            }
+            for record in self
+        }
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        if self._is_bulk_entry():
+            records = super(QualityControlAuditMixin, self.with_context(tracking_disable=True)).create(vals_list)
+            records = records.with_env(self.env)
+            self.env['quality.control.audit.log']._log_batch(
+                'create', records, {name for vals in vals_list for name in vals}
+            )
+            return records
+        records = super().create(vals_list)
+        entries = []
+        for record, vals in zip(records, vals_list):
+            names = record._get_audit_fields(vals)
+            scalar = [name for name in names if self._fields[name].type != 'binary']
+            changes = record._snapshot_audit_values(scalar)[record.id]
+            changes.update({name: bool(vals[name]) for name in names if name not in scalar})
+            entries.append((self._name, record.id, 'create', changes))
+        self.env['quality.control.audit.trail']._append(entries)
+        return records
+
+    def write(self, vals):
+        if self._is_bulk_entry():
+            res = super(QualityControlAuditMixin, self.with_context(tracking_disable=True)).write(vals)
+            # Las firmas no se copian al resumen, solo se registra si se cargaron o borraron
+            values = {
+                name: bool(value) if name in self._fields and self._fields[name].type == 'binary' else value
+                for name, value in vals.items()
+            }
+            self.env['quality.control.audit.log']._log_batch('write', self, set(vals), values)
+            return res
+        names = self._get_audit_fields(vals)
+        scalar = [name for name in names if self._fields[name].type != 'binary']
+        before = self._snapshot_audit_values(scalar)
+        res = super().write(vals)
+        after = self._snapshot_audit_values(scalar)
+        entries = []
+        for record in self:
+            changes = {
+                name: [before[record.id][name], after[record.id][name]]
+                for name in scalar
+                if before[record.id][name] != after[record.id][name]
+            }
+            # Las firmas no se copian al historial, solo se registra si se cargaron o borraron
+            changes.update({name: [None, bool(vals[name])] for name in names if name not in scalar})
+            if changes:
+                entries.append((self._name, record.id, 'write', changes))
+        self.env['quality.control.audit.trail']._append(entries)
+        return res
+
+    def unlink(self):
+        if self and self._is_bulk_entry():
+            self.env['quality.control.audit.log']._log_batch('unlink', self, set())
+        elif self:
+            self.env['quality.control.audit.trail']._append([
+                (self._name, record.id, 'unlink', {'name': record.name}) for record in self
+            ])
+        return super().unlink()
+
+    def get_audit_history(self, limit=50, before_id=None):
+        """Historial paginado de este control, leído del historial compacto y no del chatter.
+
+        Devuelve ``{'entries': [...], 'next_before_id': id}``; para la página
+        siguiente se vuelve a llamar con ``before_id=next_before_id``.
+        """
+        self.ensure_one()
+        self.check_access_rights('read')
+        self.check_access_rule('read')
+        return self.env['quality.control.audit.trail'].sudo()._read_history(
+            self._name, self.id, limit=min(limit, 500), before_id=before_id
+        )
+
+
+class QualityControlAuditLog(models.Model):
+    _name = 'quality.control.audit.log'
+    _description = 'Bitácora de Auditoría de Cargas Masivas'
+    _order = 'date desc, id desc'
+
+    date = fields.Datetime(string='Fecha', default=fields.Datetime.now, readonly=True, index=True)
+    user_id = fields.Many2one('res.users', string='Usuario', default=lambda self: self.env.user, readonly=True)
+    batch_ref = fields.Char(string='Lote', readonly=True, index=True)
+
+    operation = fields.Selection([
+        ('create', 'Creación'),
+        ('write', 'Modificación'),
+        ('unlink', 'Eliminación'),
+    ], string='Operación', required=True, readonly=True)
+
+    res_model = fields.Selection(COMPLIANCE_MODELS, string='Tipo de Control', required=True, readonly=True, index=True)
+    record_count = fields.Integer(string='Registros', readonly=True)
+    res_ids = fields.Text(string='IDs', readonly=True, help='Rangos de IDs afectados, por ejemplo 10-25,31')
+    record_names = fields.Text(string='Números de Control', readonly=True)
+    field_names = fields.Char(string='Campos', readonly=True)
+    values = fields.Text(string='Valores Escritos', readonly=True)
+
+    @api.model
+    def _compress_ids(self, ids):
+        """Representar una lista de IDs como rangos compactos: [1, 2, 3, 7] -> '1-3,7'"""
+        ranges = []
+        for record_id in sorted(set(ids)):
+            if ranges and record_id == ranges[-1][1] + 1:
+                ranges[-1][1] = record_id
+            else:
+                ranges.append([record_id, record_id])
+        return ','.join(str(start) if start == end else '%s-%s' % (start, end) for start, end in ranges)
+
+    @api.model
+    def _get_batch_ref(self):
+        ref = self.env.context.get(BULK_ENTRY_CONTEXT_KEY)
+        if isinstance(ref, str):
+            return ref
+        return _('Importación') if self.env.context.get('import_file') else _('Carga Masiva')
+
+    @api.model
+    def _log_batch(self, operation, records, field_names, values=None):
+        """Registrar un único resumen para una operación en lote sobre estos controles"""
+        if not records:
+            return self.browse()
+        return self.sudo().create({
+            'batch_ref': self._get_batch_ref(),
+            'operation': operation,
+            'res_model': records._name,
+            'record_count': len(records),
+            'res_ids': self._compress_ids(records.ids),
+            'record_names': ', '.join(name for name in records.mapped('name') if name),
+            'field_names': ', '.join(sorted(field_names)),
+            'values': values and json.dumps(values, default=str, ensure_ascii=False, sort_keys=True) or False,
+        })
\ No newline at end of file
@@ -0,0 +1,249 @@
+import csv
+import io
+import logging
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools.pdf import merge_pdf
+
+from .compliance_fact import COMPLIANCE_MODELS
+
+_logger = logging.getLogger(__name__)
+
+
+# Reporte individual usado para cada tipo de control en los paquetes de auditoría
+AUDIT_REPORTS = {
+    'quality.control.cleaning.room': 'kani_factory_quality_control.action_report_quality_control_cleaning_single',
+    'quality.control.vegetable.pallet.cleaning': 'kani_factory_quality_control.action_report_quality_control_vegetable_pallet_single',
+    'quality.control.pediluvios.cleaning': 'kani_factory_quality_control.action_report_quality_control_pediluvios_single',
+    'quality.control.pest.control': 'kani_factory_quality_control.action_report_quality_control_pest_control_single',
+    'quality.control.pest.control.detail': 'kani_factory_quality_control.action_report_quality_control_pest_control_detail_single',
+    'quality.control.raw.material.reception': 'kani_factory_quality_control.action_report_quality_control_raw_material_reception_single',
+}
+
+
+class _ZipStream(io.RawIOBase):
+    """Destino de escritura no posicionable para zipfile; el generador lo vacía tras cada archivo"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class QualityControlAuditPack(models.Model):
+    _name = 'quality.control.audit.pack'
+    _description = 'Paquete de Auditoría de Controles de Calidad'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(
+        string='Descripción',
+        required=True,
+        default=lambda self: _('Auditoría Sanitaria')
+    )
+
+    date_from = fields.Date(string='Desde', required=True)
+    date_to = fields.Date(string='Hasta', required=True)
+
+    model_ids = fields.Many2many(
+        'ir.model',
+        string='Tipos de Control',
+        domain=[('model', 'in', [model for model, _label in COMPLIANCE_MODELS])],
+        required=True
+    )
+
+    only_final = fields.Boolean(
+        string='Solo Controles Cerrados',
+        default=True,
+        help='Incluir únicamente controles completados, validados o rechazados'
+    )
+
+    chunk_size = fields.Integer(
+        string='Controles por Bloque',
+        default=25,
+        help='Cada bloque se renderiza en un proceso de wkhtmltopdf independiente'
+    )
+
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('queued', 'En Cola'),
+        ('done', 'Generado'),
+        ('failed', 'Error'),
+    ], string='Estado', default='draft', readonly=True)
+
+    record_count = fields.Integer(string='Controles', readonly=True)
+    duration = fields.Float(string='Duración (segundos)', digits=(10, 1), readonly=True)
+    error_message = fields.Text(string='Error', readonly=True)
+    pdf_file = fields.Binary(string='PDF', attachment=True, readonly=True)
+    pdf_filename = fields.Char(string='Nombre del Archivo', readonly=True)
+
+    @api.constrains('date_from', 'date_to', 'chunk_size')
+    def _check_parameters(self):
+        for record in self:
+            if record.date_from > record.date_to:
+                raise ValidationError(_('La fecha inicial no puede ser posterior a la fecha final'))
+            if record.chunk_size < 1:
+                raise ValidationError(_('Cada bloque debe contener al menos un control'))
+
+    def _get_pack_facts(self):
+        """Filas de cumplimiento del paquete, ordenadas por tipo de control y fecha"""
+        self.ensure_one()
+        domain = [
+            ('res_model', 'in', self.model_ids.mapped('model')),
+            ('date', '>=', self.date_from),
+            ('date', '<=', self.date_to),
+        ]
+        if self.only_final:
+            domain.append(('is_final', '=', True))
+        facts = self.env['quality.control.compliance.fact'].search_read(
+            domain, ['res_model', 'res_id', 'name', 'date', 'state', 'is_compliant', 'responsible_id'],
+            order='date, id'
+        )
+        model_order = {model: index for index, (model, _label) in enumerate(COMPLIANCE_MODELS)}
+        return sorted(facts, key=lambda fact: model_order[fact['res_model']])
+
+    def _get_pack_records(self):
+        """Lista ordenada de (modelo, ids) del paquete"""
+        ids_by_model = {}
+        for fact in self._get_pack_facts():
+            ids_by_model.setdefault(fact['res_model'], []).append(fact['res_id'])
+        return [
+            (model, ids_by_model[model])
+            for model, _label in COMPLIANCE_MODELS
+            if model in ids_by_model
+        ]
+
+    @api.model
+    def _get_audit_workers(self):
+        """Procesos de wkhtmltopdf simultáneos, acotados por las conexiones disponibles"""
+        workers = int(self.env['ir.config_parameter'].sudo().get_param(
+            'kani_factory_quality_control.audit_pack_workers', 4
+        ))
+        return max(1, min(workers, tools.config['db_maxconn'] // 2))
+
+    @api.model
+    def _render_chunk(self, uid, context, report_ref, res_ids):
+        """Renderizar un bloque con su propio cursor; se ejecuta en un hilo del pool"""
+        with self.env.registry.cursor() as cr:
+            env = api.Environment(cr, uid, context)
+            pdf_content, _content_type = env['ir.actions.report']._render_qweb_pdf(report_ref, res_ids)
+            return pdf_content
+
+    def _generate(self):
+        """Renderizar el paquete en bloques paralelos y unir los PDF en orden"""
+        self.ensure_one()
+        started = time.monotonic()
+        chunks = [
+            (AUDIT_REPORTS[model], ids[start:start + self.chunk_size])
+            for model, ids in self._get_pack_records()
+            for start in range(0, len(ids), self.chunk_size)
+        ]
+        if not chunks:
+            raise UserError(_('No hay controles en el rango de fechas seleccionado'))
+        uid, context = self.env.uid, dict(self.env.context)
+        with ThreadPoolExecutor(max_workers=self._get_audit_workers()) as pool:
+            pdfs = list(pool.map(lambda chunk: self._render_chunk(uid, context, *chunk), chunks))
+        self.write({
+            'state': 'done',
+            'record_count': sum(len(ids) for _report, ids in chunks),
+            'duration': time.monotonic() - started,
+            'error_message': False,
+            'pdf_file': merge_pdf(pdfs),
+            'pdf_filename': 'Auditoria_%s_%s.pdf' % (
+                self.date_from.strftime('%Y%m%d'), self.date_to.strftime('%Y%m%d'),
+            ),
+        })
+
+    def _get_zip_filename(self):
+        self.ensure_one()
+        return 'Auditoria_%s_%s.zip' % (self.date_from.strftime('%Y%m%d'), self.date_to.strftime('%Y%m%d'))
+
+    def _iter_zip_export(self, cache_batch=50):
+        """Generar el ZIP del paquete por partes: un PDF por control y un manifiesto CSV.
+
+        Cada PDF se toma del adjunto cacheado si existe o se renderiza en el
+        momento, y sus bytes se entregan en cuanto se agregan al archivo, por lo
+        que el ZIP completo nunca está en memoria ni en disco.
+        """
+        self.ensure_one()
+        Report = self.env['ir.actions.report']
+        labels = dict(COMPLIANCE_MODELS)
+        stream = _ZipStream()
+        manifest = [['archivo', 'tipo_control', 'numero', 'fecha', 'estado', 'cumple', 'responsable', 'origen']]
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for index, fact in enumerate(self._get_pack_facts(), start=1):
+                record = self.env[fact['res_model']].browse(fact['res_id'])
+                report = Report._get_report(AUDIT_REPORTS[fact['res_model']])
+                attachment = report.retrieve_attachment(record)
+                if attachment:
+                    pdf_content, source = attachment.raw, 'cache'
+                else:
+                    pdf_content, _content_type = Report._render_qweb_pdf(report, [record.id])
+                    source = 'render'
+                filename = '%s/%s.pdf' % (labels[fact['res_model']], (fact['name'] or str(record.id)).replace('/', '_'))
+                archive.writestr(filename, pdf_content)
+                manifest.append([
+                    filename,
+                    labels[fact['res_model']],
+                    fact['name'] or '',
+                    fact['date'] or '',
+                    fact['state'] or '',
+                    'SI' if fact['is_compliant'] else 'NO',
+                    fact['responsible_id'] and fact['responsible_id'][1] or '',
+                    source,
+                ])
+                yield stream.pop()
+                if index % cache_batch == 0:
+                    self.env.invalidate_all()
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(manifest)
+            archive.writestr('manifiesto.csv', buffer.getvalue().encode('utf-8-sig'))
+        yield stream.pop()
+
+    @api.model
+    def _cron_generate_packs(self):
+        """Generar los paquetes en cola, confirmando cada uno por separado"""
+        for pack in self.search([('state', '=', 'queued')]):
+            try:
+                pack._generate()
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception("Error al generar el paquete de auditoría %s", pack.id)
+                pack.write({'state': 'failed', 'error_message': str(e)})
+            self.env.cr.commit()
+
+    def action_generate(self):
+        for pack in self:
+            if not pack._get_pack_records():
+                raise UserError(_('No hay controles en el rango de fechas seleccionado'))
+        self.write({'state': 'queued', 'pdf_file': False, 'error_message': False})
+        self.env.ref('kani_factory_quality_control.cron_generate_audit_packs')._trigger()
+        return True
+
+    def action_download_zip(self):
+        self.ensure_one()
+        if not self._get_pack_facts():
+            raise UserError(_('No hay controles en el rango de fechas seleccionado'))
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/quality_control/audit_pack/%s/zip' % self.id,
+            'target': 'self',
+        }
+
+    def action_reset_draft(self):
+        self.write({'state': 'draft'})
+        return True
\ No newline at end of file
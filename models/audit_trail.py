@@ -0,0 +1,212 @@
+import hashlib
+import json
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import create_index
+
+
+class QualityControlAuditTrail(models.Model):
+    _name = 'quality.control.audit.trail'
+    _description = 'Historial de Auditoría de Controles'
+    _order = 'id desc'
+    _log_access = False
+
+    res_model = fields.Char(string='Modelo', required=True, readonly=True)
+    res_id = fields.Many2oneReference(string='ID del Control', model_field='res_model', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='Usuario', readonly=True, ondelete='restrict')
+    timestamp = fields.Datetime(string='Fecha y Hora', required=True, readonly=True)
+
+    operation = fields.Selection([
+        ('create', 'Creación'),
+        ('write', 'Modificación'),
+        ('unlink', 'Eliminación'),
+    ], string='Operación', required=True, readonly=True)
+
+    changes = fields.Json(string='Cambios', readonly=True)
+    changes_display = fields.Text(string='Detalle de Cambios', compute='_compute_changes_display')
+    prev_hash = fields.Char(string='Hash Anterior', readonly=True)
+    hash = fields.Char(string='Hash', readonly=True)
+
+    def init(self):
+        """Índices del historial y protección de solo inserción a nivel de base de datos"""
+        # BRIN: las filas se insertan en orden cronológico, el índice ocupa unas pocas páginas
+        create_index(
+            self._cr, 'quality_control_audit_trail_timestamp_brin_index',
+            self._table, ['timestamp'], method='brin',
+        )
+        create_index(
+            self._cr, 'quality_control_audit_trail_record_index',
+            self._table, ['res_model', 'res_id', 'id DESC'],
+        )
+        self._cr.execute("""
+            CREATE OR REPLACE FUNCTION quality_control_audit_trail_append_only() RETURNS trigger AS $$
+            BEGIN
+                RAISE EXCEPTION 'quality_control_audit_trail es de solo inserción';
+            END;
+            $$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS quality_control_audit_trail_append_only ON quality_control_audit_trail;
+            CREATE TRIGGER quality_control_audit_trail_append_only
+                BEFORE UPDATE OR DELETE ON quality_control_audit_trail
+                FOR EACH ROW EXECUTE FUNCTION quality_control_audit_trail_append_only();
+
+            -- Último hash de la cadena de cada control; su fila se bloquea mientras se agregan entradas
+            CREATE TABLE IF NOT EXISTS quality_control_audit_trail_head (
+                res_model varchar NOT NULL,
+                res_id integer NOT NULL,
+                hash varchar NOT NULL,
+                PRIMARY KEY (res_model, res_id)
+            );
+        """)
+
+    @api.depends('changes')
+    def _compute_changes_display(self):
+        for record in self:
+            record.changes_display = json.dumps(record.changes or {}, ensure_ascii=False, indent=2, sort_keys=True)
+
+    def write(self, vals):
+        raise UserError(_('El historial de auditoría no se puede modificar'))
+
+    def unlink(self):
+        raise UserError(_('El historial de auditoría no se puede eliminar'))
+
+    @api.model
+    def _compute_hash(self, prev_hash, res_model, res_id, user_id, timestamp, operation, changes):
+        payload = json.dumps(
+            [prev_hash or '', res_model, res_id, user_id or 0, fields.Datetime.to_string(timestamp), operation, changes],
+            default=str, ensure_ascii=False, sort_keys=True, separators=(',', ':'),
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @api.model
+    def _append(self, entries):
+        """Agregar en una sola inserción las entradas (modelo, id, operación, cambios) al final de su cadena.
+
+        Cada control tiene su propia cadena, cuyo último hash se guarda en una
+        fila de quality_control_audit_trail_head. Se lee con FOR UPDATE: solo
+        dos transacciones que escriben el mismo control se serializan en esa
+        fila (la segunda falla por serialización y Odoo la reintenta, así nunca
+        encadena sobre un hash que su snapshot no ve), igual que ya lo hacían
+        en la fila del propio control; los demás guardados no se bloquean.
+        """
+        if not entries:
+            return
+        cr = self.env.cr
+        keys = sorted({(entry[0], entry[1]) for entry in entries})
+        key_columns = [[res_model for res_model, _res_id in keys], [res_id for _res_model, res_id in keys]]
+        cr.execute("""
+            INSERT INTO quality_control_audit_trail_head (res_model, res_id, hash)
+            SELECT res_model, res_id, '' FROM UNNEST(%s::varchar[], %s::int[]) AS head(res_model, res_id)
+                ON CONFLICT DO NOTHING
+        """, key_columns)
+        cr.execute("""
+            SELECT head.res_model, head.res_id, head.hash
+              FROM quality_control_audit_trail_head AS head
+              JOIN UNNEST(%s::varchar[], %s::int[]) AS entry(res_model, res_id)
+                ON head.res_model = entry.res_model AND head.res_id = entry.res_id
+          ORDER BY head.res_model, head.res_id
+               FOR UPDATE OF head
+        """, key_columns)
+        heads = {(res_model, res_id): head_hash for res_model, res_id, head_hash in cr.fetchall()}
+        timestamp = fields.Datetime.now()
+        user_id = self.env.uid
+        columns = {'res_model': [], 'res_id': [], 'operation': [], 'changes': [], 'prev_hash': [], 'hash': []}
+        for res_model, res_id, operation, changes in entries:
+            prev_hash = heads[(res_model, res_id)]
+            # Normalizar como quedará al leerlo de jsonb para que la verificación sea reproducible
+            changes = json.loads(json.dumps(changes, default=str, ensure_ascii=False))
+            digest = self._compute_hash(prev_hash, res_model, res_id, user_id, timestamp, operation, changes)
+            columns['res_model'].append(res_model)
+            columns['res_id'].append(res_id)
+            columns['operation'].append(operation)
+            columns['changes'].append(json.dumps(changes, ensure_ascii=False))
+            columns['prev_hash'].append(prev_hash)
+            columns['hash'].append(digest)
+            heads[(res_model, res_id)] = digest
+        cr.execute("""
+            INSERT INTO quality_control_audit_trail
+                   (res_model, res_id, user_id, timestamp, operation, changes, prev_hash, hash)
+            SELECT entry.res_model, entry.res_id, %s, %s, entry.operation, entry.changes::jsonb,
+                   entry.prev_hash, entry.hash
+              FROM UNNEST(%s::varchar[], %s::int[], %s::varchar[], %s::text[], %s::varchar[], %s::varchar[])
+                   AS entry(res_model, res_id, operation, changes, prev_hash, hash)
+        """, [
+            user_id, timestamp, columns['res_model'], columns['res_id'], columns['operation'],
+            columns['changes'], columns['prev_hash'], columns['hash'],
+        ])
+        cr.execute("""
+            UPDATE quality_control_audit_trail_head AS head
+               SET hash = new.hash
+              FROM UNNEST(%s::varchar[], %s::int[], %s::varchar[]) AS new(res_model, res_id, hash)
+             WHERE head.res_model = new.res_model AND head.res_id = new.res_id
+        """, [[key[0] for key in heads], [key[1] for key in heads], list(heads.values())])
+
+    @api.model
+    def _read_history(self, res_model, res_id, limit=50, before_id=None):
+        """Página del historial de un control, del más reciente al más antiguo (paginación por id)"""
+        query = """
+            SELECT id, timestamp, user_id, operation, changes
+              FROM quality_control_audit_trail
+             WHERE res_model = %s AND res_id = %s
+        """
+        params = [res_model, res_id]
+        if before_id:
+            query += " AND id < %s"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT %s"
+        params.append(limit)
+        self.env.cr.execute(query, params)
+        rows = self.env.cr.dictfetchall()
+        users = {user.id: user.display_name for user in self.env['res.users'].browse(
+            {row['user_id'] for row in rows if row['user_id']}
+        )}
+        for row in rows:
+            row['user'] = users.get(row['user_id'], '')
+        return {
+            'entries': rows,
+            'next_before_id': rows[-1]['id'] if len(rows) == limit else False,
+        }
+
+    @api.model
+    def _verify_chain(self, batch_size=10000):
+        """Recalcular por lotes la cadena de cada control; devuelve el primer id alterado o False"""
+        # Recorrido por control (índice res_model, res_id, id): solo se guarda el hash anterior del control en curso
+        last_key, prev_key, prev_hash, checked = ('', 0, 0), None, '', 0
+        while True:
+            self.env.cr.execute("""
+                SELECT id, res_model, res_id, user_id, timestamp, operation, changes, prev_hash, hash
+                  FROM quality_control_audit_trail
+                 WHERE (res_model, res_id, id) > (%s, %s, %s)
+              ORDER BY res_model, res_id, id
+                 LIMIT %s
+            """, list(last_key) + [batch_size])
+            rows = self.env.cr.fetchall()
+            if not rows:
+                return {'checked': checked, 'broken_id': False}
+            for row_id, res_model, res_id, user_id, timestamp, operation, changes, stored_prev, stored_hash in rows:
+                if (res_model, res_id) != prev_key:
+                    prev_key, prev_hash = (res_model, res_id), ''
+                expected = self._compute_hash(prev_hash, res_model, res_id, user_id, timestamp, operation, changes)
+                if (stored_prev or '') != prev_hash or stored_hash != expected:
+                    return {'checked': checked, 'broken_id': row_id}
+                prev_hash, last_key = stored_hash, (res_model, res_id, row_id)
+                checked += 1
+
+    def action_verify_chain(self):
+        result = self._verify_chain()
+        if result['broken_id']:
+            message = _('La cadena está alterada a partir del registro %s (%s registros verificados).') % (
+                result['broken_id'], result['checked'])
+        else:
+            message = _('Cadena íntegra: %s registros verificados.') % result['checked']
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Verificación del Historial'),
+                'message': message,
+                'type': 'danger' if result['broken_id'] else 'success',
+                'sticky': bool(result['broken_id']),
+            }
+        }
\ No newline at end of file
@@ -0,0 +1,173 @@
+from odoo import models, fields, api, _
+
+
+# Modelos de control que alimentan la tabla de cumplimiento
+COMPLIANCE_MODELS = [
+    ('quality.control.cleaning.room', 'Cuarto Refrigerado y Palets'),
+    ('quality.control.vegetable.pallet.cleaning', 'Palets de Verdura'),
+    ('quality.control.pediluvios.cleaning', 'Pediluvios'),
+    ('quality.control.pest.control', 'Control de Plagas'),
+    ('quality.control.pest.control.detail', 'Detalle de Control de Plagas'),
+    ('quality.control.raw.material.reception', 'Recepción de Materia Prima'),
+]
+
+FINAL_STATES = ('completed', 'validated', 'rejected')
+
+
+class QualityControlComplianceMixin(models.AbstractModel):
+    _name = 'quality.control.compliance.mixin'
+    _description = 'Sincronización con la Tabla de Cumplimiento'
+
+    # Campos cuya modificación actualiza la fila de cumplimiento del control
+    _compliance_trigger_fields = {'state'}
+
+    def _prepare_compliance_values(self):
+        """Valores de la fila de cumplimiento de este control.
+
+        Cada control lo sobrescribe para devolver date, responsible_id,
+        supervisor_id, state e is_compliant; las claves que falten quedan vacías
+        y el control se considera conforme.
+        """
+        return {}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._sync_compliance_facts()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self._compliance_trigger_fields & set(vals):
+            self._sync_compliance_facts()
+        return res
+
+    def unlink(self):
+        self.env['quality.control.compliance.fact'].sudo().search([
+            ('res_model', '=', self._name), ('res_id', 'in', self.ids),
+        ]).unlink()
+        return super().unlink()
+
+    def _sync_compliance_facts(self):
+        """Crear o actualizar en una sola sentencia las filas de cumplimiento de estos controles"""
+        if not self:
+            return
+        columns = {name: [] for name in (
+            'res_id', 'name', 'date', 'responsible_id', 'supervisor_id', 'state', 'is_final', 'is_compliant',
+        )}
+        for record in self:
+            vals = record._prepare_compliance_values()
+            columns['res_id'].append(record.id)
+            columns['name'].append(record.name or None)
+            columns['date'].append(vals.get('date') or None)
+            columns['responsible_id'].append(vals.get('responsible_id') or None)
+            columns['supervisor_id'].append(vals.get('supervisor_id') or None)
+            columns['state'].append(vals.get('state') or None)
+            columns['is_final'].append(vals.get('state') in FINAL_STATES)
+            columns['is_compliant'].append(vals.get('is_compliant', True))
+        Fact = self.env['quality.control.compliance.fact']
+        Fact.flush_model()
+        # Solo se reescriben las filas que cambiaron, como hacía la comparación campo a campo
+        self.env.cr.execute("""
+            INSERT INTO quality_control_compliance_fact AS fact
+                   (res_model, res_id, name, date, responsible_id, supervisor_id, state,
+                    is_final, is_compliant, compliance_rate, create_uid, create_date, write_uid, write_date)
+            SELECT %s, row.res_id, row.name, row.date, row.responsible_id, row.supervisor_id, row.state,
+                   row.is_final, row.is_compliant, CASE WHEN row.is_compliant THEN 100.0 ELSE 0.0 END,
+                   %s, now() AT TIME ZONE 'UTC', %s, now() AT TIME ZONE 'UTC'
+              FROM UNNEST(%s::int[], %s::varchar[], %s::date[], %s::int[], %s::int[], %s::varchar[],
+                          %s::bool[], %s::bool[])
+                   AS row(res_id, name, date, responsible_id, supervisor_id, state, is_final, is_compliant)
+                ON CONFLICT (res_model, res_id) DO UPDATE SET
+                   name = EXCLUDED.name,
+                   date = EXCLUDED.date,
+                   responsible_id = EXCLUDED.responsible_id,
+                   supervisor_id = EXCLUDED.supervisor_id,
+                   state = EXCLUDED.state,
+                   is_final = EXCLUDED.is_final,
+                   is_compliant = EXCLUDED.is_compliant,
+                   compliance_rate = EXCLUDED.compliance_rate,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+             WHERE (fact.name, fact.date, fact.responsible_id, fact.supervisor_id, fact.state, fact.is_compliant)
+                   IS DISTINCT FROM
+                   (EXCLUDED.name, EXCLUDED.date, EXCLUDED.responsible_id, EXCLUDED.supervisor_id,
+                    EXCLUDED.state, EXCLUDED.is_compliant)
+        """, [self._name, self.env.uid, self.env.uid] + list(columns.values()))
+        Fact.invalidate_model()
+
+
+class QualityControlComplianceFact(models.Model):
+    _name = 'quality.control.compliance.fact'
+    _description = 'Hecho de Cumplimiento de Controles de Calidad'
+    _order = 'date desc, id desc'
+
+    res_model = fields.Selection(
+        COMPLIANCE_MODELS,
+        string='Tipo de Control',
+        required=True,
+        readonly=True,
+        index=True
+    )
+
+    res_id = fields.Many2oneReference(
+        string='ID del Control',
+        model_field='res_model',
+        required=True,
+        readonly=True
+    )
+
+    name = fields.Char(string='Número de Control', readonly=True)
+    date = fields.Date(string='Fecha', readonly=True, index=True)
+    responsible_id = fields.Many2one('res.users', string='Responsable', readonly=True)
+    supervisor_id = fields.Many2one('res.users', string='Supervisión', readonly=True)
+    state = fields.Char(string='Estado', readonly=True)
+    is_final = fields.Boolean(string='Cerrado', readonly=True)
+    is_compliant = fields.Boolean(string='Cumple', readonly=True)
+
+    compliance_rate = fields.Float(
+        string='% Cumplimiento',
+        digits=(5, 2),
+        readonly=True,
+        group_operator='avg'
+    )
+
+    _sql_constraints = [
+        ('unique_control', 'unique(res_model, res_id)', 'Cada control solo puede tener una fila de cumplimiento!'),
+    ]
+
+    @api.model
+    def _rebuild(self, batch_size=1000):
+        """Reconstruir la tabla completa a partir de todos los controles"""
+        self.search([]).unlink()
+        for model_name, _label in COMPLIANCE_MODELS:
+            Model = self.env[model_name].with_context(active_test=False)
+            ids = Model.search([]).ids
+            for start in range(0, len(ids), batch_size):
+                batch = Model.browse(ids[start:start + batch_size])
+                batch._sync_compliance_facts()
+                batch.invalidate_recordset()
+        return True
+
+    def action_rebuild(self):
+        self._rebuild()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Cumplimiento Reconstruido'),
+                'message': _('La tabla de cumplimiento se reconstruyó a partir de todos los controles.'),
+                'type': 'success',
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            }
+        }
+
+    def action_open_control(self):
+        """Abrir el control original"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self.res_model,
+            'res_id': self.res_id,
+            'view_mode': 'form',
+        }
\ No newline at end of file
@@ -0,0 +1,67 @@
+import base64
+import io
+
+from odoo import models, api, tools
+from odoo.tools import file_open
+from odoo.tools.pdf import PdfFileReader, PdfFileWriter
+
+from .raw_material_reception_report import MULTIPLE_REPORT
+
+
+KANI_LOGO_PATH = 'kani_factory_quality_control/static/src/img/kani_logo.png'
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    @api.model
+    @tools.ormcache()
+    def _get_kani_logo_data_uri(self):
+        """Logo de KANI como data URI, leído del disco una sola vez por registro"""
+        with file_open(KANI_LOGO_PATH, 'rb') as logo:
+            return 'data:image/png;base64,%s' % base64.b64encode(logo.read()).decode()
+
+    def _get_rendering_context(self, report, docids, data):
+        data = super()._get_rendering_context(report, docids, data)
+        if report.report_name.startswith('kani_factory_quality_control.'):
+            data['kani_logo_src'] = self._get_kani_logo_data_uri()
+        return data
+
+    @api.model
+    def _get_reception_report_chunk_size(self):
+        """Recepciones por bloque del reporte múltiple (parámetro del sistema)"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'kani_factory_quality_control.reception_report_chunk_size', 200
+        ))
+
+    def _render_qweb_pdf(self, report_ref, res_ids=None, data=None):
+        """Renderizar el reporte múltiple de recepciones por bloques de tamaño acotado.
+
+        Los resúmenes se calculan una sola vez en SQL; cada bloque de filas se
+        convierte en PDF por separado, sus páginas se agregan al documento final
+        en cuanto se renderiza y se libera la caché del ORM entre bloques, de
+        modo que no se acumulan los PDF de todos los bloques.
+        """
+        chunk_size = self._get_reception_report_chunk_size()
+        if (
+            not res_ids or len(res_ids) <= chunk_size
+            or self._get_report(report_ref).report_name != MULTIPLE_REPORT
+        ):
+            return super()._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+        res_ids = self.env['quality.control.raw.material.reception'].with_context(active_test=False).search(
+            [('id', 'in', list(res_ids))], order='reception_date, id'
+        ).ids
+        summary = self.env['report.' + MULTIPLE_REPORT]._get_summary(res_ids)
+        chunks = [res_ids[start:start + chunk_size] for start in range(0, len(res_ids), chunk_size)]
+        writer = PdfFileWriter()
+        for index, chunk_ids in enumerate(chunks):
+            chunk_data = dict(data or {}, summary=summary, chunk_index=index, chunk_count=len(chunks))
+            pdf_content, _content_type = super()._render_qweb_pdf(report_ref, res_ids=chunk_ids, data=chunk_data)
+            reader = PdfFileReader(io.BytesIO(pdf_content), strict=False)
+            for page in range(reader.getNumPages()):
+                writer.addPage(reader.getPage(page))
+            del pdf_content
+            self.env.invalidate_all()
+        with io.BytesIO() as buffer:
+            writer.write(buffer)
+            return buffer.getvalue(), 'pdf'
\ No newline at end of file
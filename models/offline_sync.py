@@ -0,0 +1,223 @@
+from datetime import timedelta
+
+import psycopg2
+
+from odoo import models, fields, api, Command, _
+from odoo.exceptions import AccessError, UserError
+
+from .audit_log import BULK_ENTRY_CONTEXT_KEY
+from .compliance_fact import COMPLIANCE_MODELS, FINAL_STATES
+
+
+# Formularios que los inspectores llenan sin conexión en las tabletas
+SYNC_MODELS = [
+    'quality.control.cleaning.room',
+    'quality.control.vegetable.pallet.cleaning',
+    'quality.control.pediluvios.cleaning',
+    'quality.control.pest.control',
+    'quality.control.pest.control.detail',
+]
+
+# Campos que solo cambia el servidor (secuencia, flujo de estados y archivo)
+SYNC_PROTECTED_FIELDS = {'name', 'state', 'active'}
+
+SYNC_MAX_BATCH = 500
+
+# Días que se conservan las claves de idempotencia (reenvíos posteriores se crearían de nuevo)
+SYNC_KEY_RETENTION_DAYS = 90
+
+# Clave del bloqueo transaccional que serializa los lotes de un mismo usuario
+SYNC_LOCK = 0x4B53594E
+
+
+class QualityControlSyncRecord(models.Model):
+    _name = 'quality.control.sync.record'
+    _description = 'Formulario Sincronizado desde Tableta'
+    _order = 'id desc'
+    _log_access = False
+
+    key = fields.Char(string='Clave de Idempotencia', required=True, readonly=True)
+    batch_ref = fields.Char(string='Lote', readonly=True, index=True)
+    user_id = fields.Many2one('res.users', string='Usuario', required=True, readonly=True, ondelete='cascade')
+    date = fields.Datetime(string='Fecha de Sincronización', required=True, readonly=True, index=True)
+
+    res_model = fields.Selection(
+        [(model_name, label) for model_name, label in COMPLIANCE_MODELS if model_name in SYNC_MODELS],
+        string='Tipo de Control',
+        required=True,
+        readonly=True
+    )
+
+    res_id = fields.Many2oneReference(string='ID del Control', model_field='res_model', readonly=True)
+
+    operation = fields.Selection([
+        ('create', 'Creación'),
+        ('write', 'Modificación'),
+    ], string='Operación', required=True, readonly=True)
+
+    _sql_constraints = [
+        ('unique_key', 'unique(user_id, key)', 'La clave de idempotencia ya fue sincronizada!'),
+    ]
+
+    @api.autovacuum
+    def _gc_sync_records(self):
+        cutoff = fields.Datetime.now() - timedelta(days=SYNC_KEY_RETENTION_DAYS)
+        self.env.cr.execute("DELETE FROM quality_control_sync_record WHERE date < %s", [cutoff])
+
+    @api.model
+    def _prepare_sync_values(self, Model, values, replace_lines=False):
+        """Validar los valores enviados por la tableta y convertir las líneas en comandos"""
+        if not isinstance(values, dict):
+            raise UserError(_('Los valores del formulario deben ser un objeto'))
+        vals = {}
+        for name, value in values.items():
+            field = Model._fields.get(name)
+            if not field or name in SYNC_PROTECTED_FIELDS or (field.compute and not field.inverse):
+                raise UserError(_('El campo %s no se puede sincronizar') % name)
+            if field.type == 'one2many' and isinstance(value, list) and all(isinstance(line, dict) for line in value):
+                # Las líneas capturadas sin conexión reemplazan a las del servidor
+                value = ([Command.clear()] if replace_lines else []) + [Command.create(line) for line in value]
+            vals[name] = value
+        return vals
+
+    @api.model
+    def _apply_batch(self, entries, batch_ref=False):
+        """Aplicar en una sola transacción un lote de formularios capturados sin conexión.
+
+        Cada entrada es ``{'key', 'model', 'values'}`` para crear un control, o
+        además ``'id'`` y ``'write_date'`` (la versión que editó la tableta) para
+        modificarlo; ``'complete': True`` lo completa después de guardarlo.
+        Devuelve un resultado por entrada, en el mismo orden, con estado
+        ``created``, ``updated``, ``duplicate`` (clave ya aplicada; reenviar es
+        inofensivo), ``conflict`` o ``error``; los guardados incluyen el
+        ``write_date`` que la tableta debe enviar en su próxima modificación.
+        """
+        if not isinstance(entries, list) or len(entries) > SYNC_MAX_BATCH:
+            raise UserError(_('El lote debe ser una lista de como máximo %s formularios') % SYNC_MAX_BATCH)
+        now = fields.Datetime.now()
+        batch_ref = batch_ref or '%s-%s' % (self.env.uid, now.strftime('%Y%m%d%H%M%S'))
+        context = {BULK_ENTRY_CONTEXT_KEY: _('Sincronización de tableta %s') % batch_ref}
+        cr = self.env.cr
+        # Dos reenvíos simultáneos del mismo lote no deben aplicarse dos veces
+        cr.execute("SELECT pg_advisory_xact_lock(%s, %s)", [SYNC_LOCK, self.env.uid])
+
+        keys = [entry['key'] for entry in entries if isinstance(entry, dict) and isinstance(entry.get('key'), str)]
+        applied = {
+            record.key: record
+            for record in self.sudo().search([('user_id', '=', self.env.uid), ('key', 'in', keys)])
+        }
+        results = [None] * len(entries)
+        to_create = {}
+        to_write = []
+        seen = set()
+        for index, entry in enumerate(entries):
+            key = isinstance(entry, dict) and entry.get('key')
+            if not key or not isinstance(key, str):
+                results[index] = {'key': key, 'status': 'error', 'message': _('Falta la clave de idempotencia')}
+                continue
+            if key in applied or key in seen:
+                previous = applied.get(key)
+                results[index] = {'key': key, 'status': 'duplicate', 'id': previous and previous.res_id}
+                continue
+            seen.add(key)
+            if entry.get('model') not in SYNC_MODELS:
+                results[index] = {'key': key, 'status': 'error', 'message': _('Tipo de formulario no sincronizable')}
+                continue
+            if entry.get('id') and not isinstance(entry['id'], int):
+                results[index] = {'key': key, 'status': 'error', 'message': _('Identificador de control inválido')}
+                continue
+            Model = self.env[entry['model']].with_context(**context)
+            try:
+                vals = self._prepare_sync_values(Model, entry.get('values') or {}, replace_lines=bool(entry.get('id')))
+            except UserError as error:
+                results[index] = {'key': key, 'status': 'error', 'message': str(error)}
+                continue
+            if entry.get('id'):
+                to_write.append((index, Model.browse(entry['id']), vals))
+            else:
+                to_create.setdefault(entry['model'], []).append((index, vals))
+
+        synced = []
+        for model_name, items in to_create.items():
+            Model = self.env[model_name].with_context(**context)
+            created, errors = self._create_sync_records(Model, items)
+            for index, record in created:
+                results[index] = {'key': entries[index]['key'], 'status': 'created', 'id': record.id}
+                synced.append((index, record, 'create'))
+            for index, message in errors:
+                results[index] = {'key': entries[index]['key'], 'status': 'error', 'message': message}
+        for index, record, vals in to_write:
+            key = entries[index]['key']
+            try:
+                # Las reglas de registro pueden impedir leer el control: solo falla esta entrada
+                conflict = self._get_sync_conflict(record, entries[index].get('write_date'))
+                if conflict:
+                    results[index] = {'key': key, 'status': 'conflict', 'id': record.id, 'message': conflict}
+                    continue
+                with cr.savepoint():
+                    record.write(vals)
+            except (AccessError, UserError, ValueError, psycopg2.Error) as error:
+                results[index] = {'key': key, 'status': 'error', 'id': record.id, 'message': str(error)}
+                continue
+            results[index] = {'key': key, 'status': 'updated', 'id': record.id}
+            synced.append((index, record, 'write'))
+
+        for index, record, _operation in synced:
+            if not entries[index].get('complete'):
+                continue
+            try:
+                with cr.savepoint():
+                    record.action_complete_control()
+            except UserError as error:
+                # El formulario queda guardado; la tableta muestra por qué no se pudo completar
+                results[index]['message'] = str(error)
+        self.sudo().create([{
+            'key': entries[index]['key'],
+            'batch_ref': batch_ref,
+            'user_id': self.env.uid,
+            'date': now,
+            'res_model': record._name,
+            'res_id': record.id,
+            'operation': operation,
+        } for index, record, operation in synced])
+        # Versión que la tableta debe devolver al modificar de nuevo el control
+        for index, record, _operation in synced:
+            results[index]['write_date'] = fields.Datetime.to_string(record.write_date)
+        return {'batch_ref': batch_ref, 'results': results}
+
+    @api.model
+    def _create_sync_records(self, Model, items):
+        """Crear en lote los formularios de un modelo; si el lote falla, aislar los formularios inválidos.
+
+        Devuelve ``([(posición, registro)], [(posición, mensaje de error)])``.
+        """
+        try:
+            with self.env.cr.savepoint():
+                records = Model.create([vals for _index, vals in items])
+            return list(zip([index for index, _vals in items], records)), []
+        except (AccessError, UserError, ValueError, psycopg2.Error):
+            pass
+        created, errors = [], []
+        for index, vals in items:
+            try:
+                with self.env.cr.savepoint():
+                    created.append((index, Model.create(vals)))
+            except (AccessError, UserError, ValueError, psycopg2.Error) as error:
+                errors.append((index, str(error)))
+        return created, errors
+
+    @api.model
+    def _get_sync_conflict(self, record, client_write_date):
+        """Motivo por el que la modificación de la tableta no se puede aplicar, o False"""
+        if not record.exists():
+            return _('El control ya no existe en el servidor')
+        if record.state in FINAL_STATES:
+            return _('El control ya fue cerrado en el servidor')
+        try:
+            client_write_date = client_write_date and fields.Datetime.to_datetime(client_write_date)
+        except ValueError:
+            client_write_date = False
+        # La tableta solo recibe write_date con precisión de segundos
+        if not client_write_date or record.write_date.replace(microsecond=0) > client_write_date:
+            return _('El control se modificó en el servidor después de la última sincronización')
+        return False
\ No newline at end of file
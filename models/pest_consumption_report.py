@@ -0,0 +1,38 @@
+from odoo import models, fields, api
+
+
+# Color de cada nivel de consumo en el mapa de calor (0 = SC, 1 = CC, 2 = CC+)
+CONSUMPTION_COLORS = {0: '#d4edda', 1: '#fff3cd', 2: '#f8d7da'}
+
+
+class ReportPestConsumptionHeatmap(models.AbstractModel):
+    _name = 'report.kani_factory_quality_control.report_pest_consumption_heatmap'
+    _description = 'Mapa de Calor de Consumo de Trampas'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        """Filas del mapa de calor servidas desde la matriz cacheada, con la tendencia de cada estación"""
+        data = data or {}
+        heatmap = self.env['quality.control.pest.control.line'].get_consumption_heatmap(
+            data.get('date_from'), data.get('date_to')
+        )
+        weeks = [fields.Date.to_date(week) for week in heatmap['weeks']]
+        rows = [
+            {
+                'code': code,
+                'cells': [
+                    {'level': level, 'color': CONSUMPTION_COLORS.get(level, '#ffffff')}
+                    for level in levels
+                ],
+                'trend': trend,
+            }
+            for code, levels, trend in zip(heatmap['stations'], heatmap['matrix'], heatmap['trends'])
+        ]
+        return {
+            'doc_ids': docids,
+            'doc_model': 'quality.control.pest.control.line',
+            'docs': self.env['quality.control.pest.control.line'],
+            'weeks': weeks,
+            'rows': rows,
+            'rising_count': sum(1 for row in rows if row['trend']['rising']),
+        }
\ No newline at end of file
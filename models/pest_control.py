@@ -1,12 +1,29 @@
-from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
-from datetime import datetime
+import logging
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import create_index
+from datetime import datetime, timedelta
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    _logger.debug("numpy no está instalado: el análisis de tendencia de consumo no estará disponible")
+
+
+# Nivel numérico de consumo de trampa, en el orden de la selección
+CONSUMPTION_LEVELS = {'sc': 0, 'cc': 1, 'cc_plus': 2}
 
 
 class QualityControlPestControl(models.Model):
     _name = 'quality.control.pest.control'
     _description = 'Control de Plagas Planta KANI'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['quality.control.audit.mixin', 'mail.thread', 'mail.activity.mixin',
+                'quality.control.compliance.mixin', 'quality.control.report.cache.mixin',
+                'quality.control.archive.mixin', 'quality.control.text.search.mixin']
     _order = 'control_date desc'
 
     name = fields.Char(
@@ -67,51 +84,50 @@ class QualityControlPestControl(models.Model):
     
     notes = fields.Text(string='Observaciones Generales')
     
-    @api.model
-    def create(self, vals):
-        """Create default location lines when creating a new control"""
-        record = super().create(vals)
-        # Only create default lines if no lines were provided
-        if not record.pest_control_line_ids:
-            record._create_default_lines()
-        return record
+    _compliance_trigger_fields = {
+        'name', 'state', 'control_date', 'responsible_id', 'supervisor_id', 'pest_control_line_ids',
+    }
+    
+    def _prepare_compliance_values(self):
+        lines = self.pest_control_line_ids
+        return {
+            'date': self.control_date,
+            'responsible_id': self.responsible_id.id,
+            'supervisor_id': self.supervisor_id.id,
+            'state': self.state,
+            'is_compliant': all(line.cleanliness_ok and line.trap_consumption != 'cc_plus' for line in lines),
+        }
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Create default location lines when creating new controls"""
+        records = super().create(vals_list)
+        # Only create default lines for controls that ended up without lines (one prefetched read)
+        records.filtered(lambda record: not record.pest_control_line_ids)._create_default_lines()
+        return records
     
     def _create_default_lines(self):
-        """Create default lines for all standard locations"""
-        default_locations = [
-            ('Comedor', 'A-01'),
-            ('Comedor', 'A-02'),
-            ('Pila', 'B-01'),
-            ('Cocina', 'B-02'),
-            ('Ingreso IG', 'B-03'),
-            ('Galvano IG', 'B-04'),
-            ('Pulido IG', 'B-05'),
-            ('Centro IG', 'B-06'),
-            ('Moldes IG', 'B-07'),
-            ('Pasillo Desh', 'C-01'),
-            ('Desh', 'C-02'),
-            ('Taller', 'C-03'),
-            ('Bodega Granos', 'L-01'),
-        ]
-        
+        """Create default lines for all standard locations on every control in self"""
+        default_stations = self.env['quality.control.pest.trap.station']._get_station_map()['defaults']
         line_vals = []
-        for location, code in default_locations:
-            line_vals.append({
-                'pest_control_id': self.id,
-                'location': location,
-                'code': code,
-                'cleanliness_ok': True,  # Default to clean
-                'trap_consumption': 'sc',  # Default to no consumption
-            })
+        for control in self:
+            for location, code, sequence in default_stations:
+                line_vals.append({
+                    'pest_control_id': control.id,
+                    'sequence': sequence,
+                    'location': location,
+                    'code': code,
+                    'cleanliness_ok': True,  # Default to clean
+                    'trap_consumption': 'sc',  # Default to no consumption
+                })
         
-        # Create all lines in batch for better performance
+        # Create all lines of all controls in a single batch
         if line_vals:
             self.env['quality.control.pest.control.line'].create(line_vals)
     
     def action_create_default_lines(self):
         """Manual action to create default lines if they don't exist"""
-        if not self.pest_control_line_ids:
-            self._create_default_lines()
+        self.filtered(lambda control: not control.pest_control_line_ids)._create_default_lines()
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
@@ -150,8 +166,13 @@ class QualityControlPestControl(models.Model):
 class QualityControlPestControlLine(models.Model):
     _name = 'quality.control.pest.control.line'
     _description = 'Línea de Control de Plagas'
+    _inherit = ['quality.control.text.search.mixin']
     _order = 'sequence, code'
 
+    _text_search_fields = {'observations': 'B'}
+    _text_search_control_model = 'quality.control.pest.control'
+    _text_search_control_field = 'pest_control_id'
+
     pest_control_id = fields.Many2one(
         'quality.control.pest.control',
         string='Control de Plagas',
@@ -165,36 +186,17 @@ class QualityControlPestControlLine(models.Model):
         help="Usado para ordenar las líneas"
     )
     
-    location = fields.Selection([
-        ('Comedor', 'Comedor'),
-        ('Pila', 'Pila'),
-        ('Cocina', 'Cocina'),
-        ('Ingreso IG', 'Ingreso IG'),
-        ('Galvano IG', 'Galvano IG'),
-        ('Pulido IG', 'Pulido IG'),
-        ('Centro IG', 'Centro IG'),
-        ('Moldes IG', 'Moldes IG'),
-        ('Pasillo Desh', 'Pasillo Desh'),
-        ('Desh', 'Desh'),
-        ('Taller', 'Taller'),
-        ('Bodega Granos', 'Bodega Granos'),
-    ], string='Ubicación', required=True)
-    
-    code = fields.Selection([
-        ('A-01', 'A-01'),
-        ('A-02', 'A-02'),
-        ('B-01', 'B-01'),
-        ('B-02', 'B-02'),
-        ('B-03', 'B-03'),
-        ('B-04', 'B-04'),
-        ('B-05', 'B-05'),
-        ('B-06', 'B-06'),
-        ('B-07', 'B-07'),
-        ('C-01', 'C-01'),
-        ('C-02', 'C-02'),
-        ('C-03', 'C-03'),
-        ('L-01', 'L-01'),
-    ], string='Código', required=True)
+    location = fields.Selection(
+        selection='_selection_location',
+        string='Ubicación',
+        required=True
+    )
+    
+    code = fields.Selection(
+        selection='_selection_code',
+        string='Código',
+        required=True
+    )
     
     cleanliness_ok = fields.Boolean(
         string='Limpieza OK',
@@ -210,26 +212,50 @@ class QualityControlPestControlLine(models.Model):
     
     observations = fields.Text(string='Observaciones')
     
+    control_date = fields.Date(
+        related='pest_control_id.control_date',
+        string='Fecha de Control',
+        store=True,
+        index=True
+    )
+    
+    consumption_level = fields.Integer(
+        string='Nivel de Consumo',
+        compute='_compute_consumption_level',
+        store=True,
+        group_operator='max',
+        help='0 = SC, 1 = CC, 2 = CC+'
+    )
+    
+    def init(self):
+        super().init()
+        # Lectura de las líneas desde el control, en el orden de la lista
+        create_index(
+            self._cr, 'quality_control_pest_control_line_control_seq_index',
+            self._table, ['pest_control_id', 'sequence', 'code'],
+        )
+    
+    @api.depends('trap_consumption')
+    def _compute_consumption_level(self):
+        for record in self:
+            record.consumption_level = CONSUMPTION_LEVELS.get(record.trap_consumption, 0)
+    
+    @api.model
+    def _selection_location(self):
+        codes_by_location = self.env['quality.control.pest.trap.station']._get_station_map()['codes_by_location']
+        return [(location, location) for location in codes_by_location]
+    
+    @api.model
+    def _selection_code(self):
+        zone_by_code = self.env['quality.control.pest.trap.station']._get_station_map()['zone_by_code']
+        return [(code, code) for code in zone_by_code]
+    
     @api.onchange('location')
     def _onchange_location(self):
         """Auto-fill code based on location selection"""
-        location_code_map = {
-            'Comedor': ['A-01', 'A-02'],
-            'Pila': ['B-01'],
-            'Cocina': ['B-02'],
-            'Ingreso IG': ['B-03'],
-            'Galvano IG': ['B-04'],
-            'Pulido IG': ['B-05'],
-            'Centro IG': ['B-06'],
-            'Moldes IG': ['B-07'],
-            'Pasillo Desh': ['C-01'],
-            'Desh': ['C-02'],
-            'Taller': ['C-03'],
-            'Bodega Granos': ['L-01'],
-        }
-        
-        if self.location and self.location in location_code_map:
-            available_codes = location_code_map[self.location]
+        codes_by_location = self.env['quality.control.pest.trap.station']._get_station_map()['codes_by_location']
+        available_codes = codes_by_location.get(self.location)
+        if available_codes:
             if len(available_codes) == 1:
                 # If only one code available, set it automatically
                 self.code = available_codes[0]
@@ -240,29 +266,135 @@ class QualityControlPestControlLine(models.Model):
     @api.constrains('location', 'code')
     def _check_location_code_combination(self):
         """Validate that the location and code combination is correct"""
-        valid_combinations = {
-            'Comedor': ['A-01', 'A-02'],
-            'Pila': ['B-01'],
-            'Cocina': ['B-02'],
-            'Ingreso IG': ['B-03'],
-            'Galvano IG': ['B-04'],
-            'Pulido IG': ['B-05'],
-            'Centro IG': ['B-06'],
-            'Moldes IG': ['B-07'],
-            'Pasillo Desh': ['C-01'],
-            'Desh': ['C-02'],
-            'Taller': ['C-03'],
-            'Bodega Granos': ['L-01'],
-        }
-        
+        codes_by_location = self.env['quality.control.pest.trap.station']._get_station_map()['codes_by_location']
         for record in self:
             if record.location and record.code:
-                if record.code not in valid_combinations.get(record.location, []):
+                if record.code not in codes_by_location.get(record.location, ()):
                     raise ValidationError(
                         _('El código %s no es válido para la ubicación %s') % 
                         (record.code, record.location)
                     )
     
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records.pest_control_id._sync_compliance_facts()
+        records.pest_control_id._clear_report_cache()
+        return records
+    
+    def write(self, vals):
+        # Las líneas forman parte del PDF del control, pero no cambian su write_date
+        controls = self.pest_control_id
+        res = super().write(vals)
+        controls |= self.pest_control_id
+        if {'pest_control_id', 'cleanliness_ok', 'trap_consumption'} & set(vals):
+            controls._sync_compliance_facts()
+        controls._clear_report_cache()
+        return res
+    
+    def unlink(self):
+        controls = self.pest_control_id
+        res = super().unlink()
+        controls = controls.exists()
+        controls._sync_compliance_facts()
+        controls._clear_report_cache()
+        return res
+    
+    # Análisis de consumo de trampas
+    @api.model
+    def _get_heatmap_version(self, date_from, date_to):
+        """Huella barata de los datos del periodo, usada como clave de la caché de la matriz"""
+        self.flush_model(['control_date', 'trap_consumption', 'code'])
+        self.env.cr.execute("""
+            SELECT COUNT(*), MAX(write_date)
+              FROM quality_control_pest_control_line
+             WHERE control_date BETWEEN %s AND %s
+        """, [date_from, date_to])
+        count, last_write = self.env.cr.fetchone()
+        return count, last_write and last_write.isoformat()
+    
+    @api.model
+    @tools.ormcache('date_from', 'date_to', 'version')
+    def _compute_consumption_matrix(self, date_from, date_to, version):
+        """Matriz estación × semana con el nivel máximo de consumo, en una sola consulta agrupada"""
+        self.env.cr.execute("""
+            SELECT code, date_trunc('week', control_date)::date AS week, MAX(consumption_level)
+              FROM quality_control_pest_control_line
+             WHERE control_date BETWEEN %s AND %s
+          GROUP BY code, week
+        """, [date_from, date_to])
+        rows = self.env.cr.fetchall()
+        stations = [code for _location, code, _sequence in
+                    self.env['quality.control.pest.trap.station']._get_station_map()['defaults']]
+        stations += sorted({row[0] for row in rows} - set(stations))
+        first_week = date_from - timedelta(days=date_from.weekday())
+        weeks = []
+        week = first_week
+        while week <= date_to:
+            weeks.append(week)
+            week += timedelta(days=7)
+        station_index = {code: i for i, code in enumerate(stations)}
+        week_index = {week: i for i, week in enumerate(weeks)}
+        matrix = [[None] * len(weeks) for _station in stations]
+        for code, week, level in rows:
+            matrix[station_index[code]][week_index[week]] = level
+        return {
+            'stations': stations,
+            'weeks': [fields.Date.to_string(week) for week in weeks],
+            'matrix': matrix,
+            'trends': self._consumption_trends(matrix),
+        }
+    
+    @api.model
+    def _consumption_trends(self, matrix, t_threshold=2.0):
+        """Pendiente de mínimos cuadrados y estadístico t por estación, vectorizados sobre la matriz.
+
+        Las semanas sin control se excluyen. Una estación tiene consumo
+        creciente si su pendiente es positiva y significativa (t > umbral). Si
+        los puntos caen exactamente sobre la recta el estadístico t no está
+        definido: se devuelve None y basta con que la pendiente sea positiva.
+        """
+        if np is None:
+            raise UserError(_("Se requiere la librería de Python 'numpy' para el análisis de tendencia"))
+        if not matrix or not matrix[0]:
+            return []
+        values = np.array(matrix, dtype=float)  # None -> nan
+        valid = ~np.isnan(values)
+        y = np.where(valid, values, 0.0)
+        t = np.broadcast_to(np.arange(values.shape[1], dtype=float), values.shape)
+        n = valid.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_mean = np.where(valid, t, 0.0).sum(axis=1) / n
+            y_mean = y.sum(axis=1) / n
+            dt = np.where(valid, t - t_mean[:, None], 0.0)
+            dy = np.where(valid, y - y_mean[:, None], 0.0)
+            sxx = (dt * dt).sum(axis=1)
+            slope = (dt * dy).sum(axis=1) / sxx
+            residuals = np.where(valid, dy - slope[:, None] * dt, 0.0)
+            stderr = np.sqrt((residuals * residuals).sum(axis=1) / (n - 2) / sxx)
+            t_stat = np.where(stderr > 0, slope / stderr, 0.0)
+        usable = (n >= 3) & (sxx > 0)
+        exact = usable & (stderr == 0)
+        slope = np.where(usable, slope, 0.0)
+        t_stat = np.where(usable, t_stat, 0.0)
+        rising = usable & (slope > 0) & (exact | (t_stat > t_threshold))
+        return [
+            {'slope': float(s), 't_stat': None if e else float(ts), 'rising': bool(r)}
+            for s, ts, e, r in zip(slope, t_stat, exact, rising)
+        ]
+    
+    @api.model
+    def get_consumption_heatmap(self, date_from=None, date_to=None):
+        """Mapa de calor de consumo de trampas por estación y semana.
+
+        Por defecto cubre los últimos dos años. El resultado se cachea por
+        periodo y se invalida solo cuando cambian las líneas del periodo.
+        """
+        date_to = fields.Date.to_date(date_to) or fields.Date.context_today(self)
+        date_from = fields.Date.to_date(date_from) or date_to - timedelta(days=730)
+        version = self._get_heatmap_version(date_from, date_to)
+        return self._compute_consumption_matrix(date_from, date_to, version)
+    
     _sql_constraints = [
         ('unique_code_per_control', 'unique(pest_control_id, code)', 
          'El código debe ser único por control!')
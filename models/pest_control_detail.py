@@ -1,14 +1,19 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
-from datetime import datetime
+from odoo.tools import create_index
+from datetime import datetime, timedelta
 
 
 class QualityControlPestControlDetail(models.Model):
     _name = 'quality.control.pest.control.detail'
     _description = 'Detalle de Control de Plagas Planta KANI'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['quality.control.audit.mixin', 'mail.thread', 'mail.activity.mixin',
+                'quality.control.compliance.mixin', 'quality.control.report.cache.mixin',
+                'quality.control.archive.mixin', 'quality.control.text.search.mixin']
     _order = 'control_date desc'
 
+    _text_search_fields = {'name': 'A', 'action_taken': 'B', 'follow_up_notes': 'B', 'notes': 'B'}
+
     name = fields.Char(
         string='Control Number',
         required=True,
@@ -53,6 +58,24 @@ class QualityControlPestControlDetail(models.Model):
         tracking=True
     )
     
+    station_id = fields.Many2one(
+        'quality.control.pest.trap.station',
+        string='Estación',
+        compute='_compute_station',
+        store=True,
+        readonly=False,
+        ondelete='set null',
+        help='Estación de trampa detectada a partir de la ubicación'
+    )
+    
+    zone = fields.Char(
+        string='Zona',
+        compute='_compute_station',
+        store=True,
+        readonly=False,
+        index=True
+    )
+    
     finding_type = fields.Selection([
         ('vivo', 'Encontrado Vivo'),
         ('muerto', 'Encontrado Muerto'),
@@ -77,6 +100,30 @@ class QualityControlPestControlDetail(models.Model):
         help="Fecha programada para verificar la efectividad de las acciones"
     )
     
+    follow_up_activity_id = fields.Many2one(
+        'mail.activity',
+        string='Actividad de Seguimiento',
+        copy=False,
+        readonly=True,
+        ondelete='set null'
+    )
+    
+    follow_up_result = fields.Selection([
+        ('effective', 'Acciones Efectivas'),
+        ('not_effective', 'Acciones No Efectivas'),
+    ], string='Resultado del Seguimiento', copy=False, tracking=True)
+    
+    follow_up_done_date = fields.Date(
+        string='Fecha de Seguimiento Realizado',
+        copy=False,
+        readonly=True
+    )
+    
+    follow_up_notes = fields.Text(
+        string='Observaciones del Seguimiento',
+        copy=False
+    )
+    
     # Signatures
     responsible_signature = fields.Binary(
         string='Firma del Responsable',
@@ -98,6 +145,127 @@ class QualityControlPestControlDetail(models.Model):
     
     notes = fields.Text(string='Observaciones Generales')
     
+    _compliance_trigger_fields = {
+        'name', 'state', 'control_date', 'responsible_id', 'supervisor_id',
+        'finding_type', 'follow_up_result',
+    }
+    
+    def _prepare_compliance_values(self):
+        return {
+            'date': self.control_date,
+            'responsible_id': self.responsible_id.id,
+            'supervisor_id': self.supervisor_id.id,
+            'state': self.state,
+            'is_compliant': self.finding_type != 'vivo' and self.follow_up_result != 'not_effective',
+        }
+    
+    @api.depends('location')
+    def _compute_station(self):
+        """Normalizar la ubicación en texto libre a una estación y zona del registro"""
+        Station = self.env['quality.control.pest.trap.station']
+        for record in self:
+            station_id, zone = Station._match_station(record.location)
+            record.station_id = station_id
+            record.zone = zone
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['quality.control.pest.hotspot']._refresh_periods(records.mapped('control_date'))
+        return records
+    
+    def init(self):
+        """Índice parcial para los seguimientos pendientes"""
+        super().init()
+        create_index(
+            self._cr, 'quality_control_pest_control_detail_pending_follow_up_index',
+            self._table, ['follow_up_date'],
+            where='follow_up_required IS TRUE AND follow_up_result IS NULL',
+        )
+    
+    @api.model
+    def _get_archive_domain(self, cutoff):
+        # Un hallazgo con seguimiento pendiente sigue en el camino caliente hasta registrar su resultado
+        return super()._get_archive_domain(cutoff) + [
+            '|', ('follow_up_required', '=', False), ('follow_up_result', '!=', False),
+        ]
+    
+    def write(self, vals):
+        hotspot_changed = bool({'control_date', 'location', 'station_id', 'zone', 'pest_type', 'finding_type'} & set(vals))
+        old_dates = self.mapped('control_date') if hotspot_changed else []
+        res = super().write(vals)
+        if hotspot_changed:
+            self.env['quality.control.pest.hotspot']._refresh_periods(old_dates + self.mapped('control_date'))
+        if 'follow_up_date' in vals and vals['follow_up_date']:
+            self.follow_up_activity_id.write({'date_deadline': vals['follow_up_date']})
+        if 'follow_up_required' in vals and not vals['follow_up_required']:
+            self.follow_up_activity_id.unlink()
+        return res
+    
+    def unlink(self):
+        dates = self.mapped('control_date')
+        res = super().unlink()
+        self.env['quality.control.pest.hotspot']._refresh_periods(dates)
+        return res
+    
+    # Seguimientos
+    @api.model
+    def _get_follow_up_lead_days(self):
+        """Días de anticipación para crear la actividad de seguimiento (parámetro del sistema)"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'kani_factory_quality_control.follow_up_lead_days', 1
+        ))
+    
+    @api.model
+    def _cron_schedule_follow_ups(self):
+        """Crear en un solo lote las actividades de los seguimientos próximos o vencidos.
+
+        Solo se consideran hallazgos sin resultado registrado y sin actividad
+        abierta, por lo que cada hallazgo tiene como máximo una actividad.
+        """
+        limit_date = fields.Date.context_today(self) + timedelta(days=self._get_follow_up_lead_days())
+        findings = self.search([
+            ('follow_up_required', '=', True),
+            ('follow_up_result', '=', False),
+            ('follow_up_date', '<=', limit_date),
+            ('follow_up_activity_id', '=', False),
+        ])
+        if not findings:
+            return
+        activity_type = self.env['quality.control.recurring.task']._get_custom_activity_type()
+        res_model_id = self.env['ir.model']._get(self._name).id
+        activities = self.env['mail.activity'].create([{
+            'activity_type_id': activity_type.id,
+            'summary': _('Seguimiento de hallazgo %s') % finding.name,
+            'note': finding.action_taken or False,
+            'date_deadline': finding.follow_up_date,
+            'user_id': finding.responsible_id.id,
+            'res_model_id': res_model_id,
+            'res_id': finding.id,
+        } for finding in findings])
+        self.flush_model(['follow_up_activity_id'])
+        self.env.cr.execute("""
+            UPDATE quality_control_pest_control_detail AS detail
+               SET follow_up_activity_id = pending.activity_id
+              FROM (SELECT UNNEST(%s) AS id, UNNEST(%s) AS activity_id) AS pending
+             WHERE detail.id = pending.id
+        """, [findings.ids, activities.ids])
+        findings.invalidate_recordset(['follow_up_activity_id'])
+    
+    def action_register_follow_up(self):
+        """Registrar el resultado del seguimiento y cerrar su actividad"""
+        for record in self:
+            if not record.follow_up_result:
+                raise ValidationError(_("Seleccione el resultado del seguimiento antes de registrarlo"))
+        self.write({'follow_up_done_date': fields.Date.context_today(self)})
+        for record in self.filtered('follow_up_activity_id'):
+            record.follow_up_activity_id.action_feedback(
+                feedback=record.follow_up_notes or dict(
+                    self._fields['follow_up_result'].selection
+                )[record.follow_up_result]
+            )
+        return True
+    
     def action_start_control(self):
         """Start the quality control process"""
         self.state = 'in_progress'
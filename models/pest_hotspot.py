@@ -0,0 +1,136 @@
+from odoo import models, fields, api, _
+
+
+class QualityControlPestHotspot(models.Model):
+    _name = 'quality.control.pest.hotspot'
+    _description = 'Foco de Hallazgos de Plagas por Zona y Periodo'
+    _order = 'period desc, rank'
+    _rec_name = 'zone'
+
+    period = fields.Date(
+        string='Periodo',
+        required=True,
+        readonly=True,
+        index=True,
+        help='Primer día del mes'
+    )
+
+    zone = fields.Char(string='Zona', readonly=True)
+
+    pest_type = fields.Selection(
+        selection=lambda self: self.env['quality.control.pest.control.detail']._fields['pest_type'].selection,
+        string='Tipo de Plaga',
+        readonly=True
+    )
+
+    finding_count = fields.Integer(string='Hallazgos', readonly=True)
+    live_count = fields.Integer(string='Encontrados Vivos', readonly=True)
+
+    severity_score = fields.Integer(
+        string='Puntaje de Severidad',
+        readonly=True,
+        help='Vivo = 3, Rastro = 2, En Trampa / Muerto = 1'
+    )
+
+    rank = fields.Integer(
+        string='Ranking',
+        readonly=True,
+        group_operator='min',
+        help='Posición del foco dentro del periodo según su severidad'
+    )
+
+    _refresh_query = """
+        INSERT INTO quality_control_pest_hotspot
+               (period, zone, pest_type, finding_count, live_count, severity_score, rank)
+        SELECT period, zone, pest_type, finding_count, live_count, severity_score,
+               RANK() OVER (PARTITION BY period ORDER BY severity_score DESC, finding_count DESC)
+          FROM (
+                SELECT date_trunc('month', control_date)::date AS period,
+                       zone,
+                       pest_type,
+                       COUNT(*) AS finding_count,
+                       COUNT(*) FILTER (WHERE finding_type = 'vivo') AS live_count,
+                       SUM(CASE finding_type
+                               WHEN 'vivo' THEN 3
+                               WHEN 'rastro' THEN 2
+                               ELSE 1
+                           END) AS severity_score
+                  FROM quality_control_pest_control_detail
+                 WHERE {where}
+              GROUP BY 1, 2, 3
+               ) AS cells
+    """
+
+    @api.depends('zone')
+    def _compute_display_name(self):
+        for record in self:
+            record.display_name = record.zone or _('Sin Zona')
+
+    @api.model
+    def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
+        # Los hallazgos sin zona se guardan con zona vacía; la etiqueta solo se traduce al mostrarla
+        groups = super().read_group(domain, fields, groupby, offset=offset, limit=limit, orderby=orderby, lazy=lazy)
+        for group in groups:
+            if 'zone' in group and not group['zone']:
+                group['zone'] = _('Sin Zona')
+        return groups
+
+    @api.model
+    def _refresh_periods(self, dates):
+        """Recalcular solo los meses que contienen estas fechas de control"""
+        periods = tuple({date.replace(day=1) for date in dates if date})
+        if not periods:
+            return
+        self.env['quality.control.pest.control.detail'].flush_model(
+            ['control_date', 'zone', 'pest_type', 'finding_type']
+        )
+        self.env.cr.execute("DELETE FROM quality_control_pest_hotspot WHERE period IN %s", [periods])
+        self.env.cr.execute(
+            self._refresh_query.format(where="date_trunc('month', control_date)::date IN %(periods)s"),
+            {'periods': periods},
+        )
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild(self):
+        """Renormalizar las ubicaciones de todos los hallazgos y reconstruir los focos"""
+        Detail = self.env['quality.control.pest.control.detail']
+        findings = Detail.with_context(active_test=False).search([])
+        self.env.add_to_compute(Detail._fields['station_id'], findings)
+        self.env.add_to_compute(Detail._fields['zone'], findings)
+        findings.flush_recordset(['station_id', 'zone'])
+        self.env.cr.execute("DELETE FROM quality_control_pest_hotspot")
+        self.env.cr.execute(self._refresh_query.format(where='control_date IS NOT NULL'))
+        self.invalidate_model()
+        return True
+
+    def action_rebuild(self):
+        self._rebuild()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Focos Reconstruidos'),
+                'message': _('Se renormalizaron las ubicaciones y se recalcularon los focos de plagas.'),
+                'type': 'success',
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            }
+        }
+
+    def action_view_findings(self):
+        """Ver los hallazgos de este foco"""
+        self.ensure_one()
+        next_period = fields.Date.add(self.period, months=1)
+        domain = [
+            ('control_date', '>=', self.period),
+            ('control_date', '<', next_period),
+            ('pest_type', '=', self.pest_type),
+        ]
+        domain.append(('zone', '=', self.zone))
+        return {
+            'name': _('Hallazgos de Plagas'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'quality.control.pest.control.detail',
+            'view_mode': 'tree,form',
+            'domain': domain,
+        }
\ No newline at end of file
@@ -0,0 +1,218 @@
+import logging
+import unicodedata
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class QualityControlPestTrapStation(models.Model):
+    _name = 'quality.control.pest.trap.station'
+    _description = 'Estación de Trampa de Control de Plagas'
+    _order = 'sequence, code'
+    _rec_name = 'code'
+
+    location = fields.Char(
+        string='Ubicación',
+        required=True
+    )
+
+    code = fields.Char(
+        string='Código',
+        required=True
+    )
+
+    zone = fields.Char(
+        string='Zona',
+        help='Agrupación de estaciones usada en los análisis de consumo y hallazgos'
+    )
+
+    sequence = fields.Integer(
+        string='Secuencia',
+        default=10,
+        help='Orden de las líneas creadas por defecto en cada control'
+    )
+
+    active = fields.Boolean(
+        string='Activo',
+        default=True,
+        help='Las estaciones archivadas no se agregan a los nuevos controles pero siguen siendo válidas en los existentes'
+    )
+
+    # Tendencia de consumo (actualizada por el cron de análisis)
+    consumption_slope = fields.Float(
+        string='Pendiente de Consumo',
+        digits=(6, 4),
+        readonly=True,
+        help='Variación semanal del nivel de consumo en el periodo de análisis'
+    )
+
+    consumption_rising = fields.Boolean(
+        string='Consumo Creciente',
+        readonly=True
+    )
+
+    _sql_constraints = [
+        ('unique_code', 'unique(code)', 'El código de la estación debe ser único!'),
+    ]
+
+    @api.model
+    @tools.ormcache()
+    def _get_station_map(self):
+        """Registro cacheado de estaciones.
+
+        Devuelve un diccionario con:
+        * codes_by_location: {ubicación: (códigos...)} incluyendo estaciones archivadas
+        * zone_by_code: {código: zona}
+        * id_by_code: {código: id de la estación}
+        * normalized_codes / normalized_locations: índices para normalizar texto libre
+        * defaults: ((ubicación, código, secuencia), ...) de las estaciones activas
+        """
+        stations = self.sudo().with_context(active_test=False).search_read(
+            [], ['location', 'code', 'zone', 'sequence', 'active'], order='sequence, code'
+        )
+        # Ubicaciones normalizadas de la más larga a la más corta para preferir la coincidencia más específica
+        locations = sorted(
+            {(self._normalize_text(station['location']), station['location']) for station in stations},
+            key=lambda item: -len(item[0]),
+        )
+        codes_by_location = {}
+        for station in stations:
+            codes_by_location.setdefault(station['location'], []).append(station['code'])
+        return {
+            'codes_by_location': {location: tuple(codes) for location, codes in codes_by_location.items()},
+            'zone_by_code': {station['code']: station['zone'] or False for station in stations},
+            'id_by_code': {station['code']: station['id'] for station in stations},
+            'normalized_codes': {self._normalize_text(station['code']): station['code'] for station in stations},
+            'normalized_locations': tuple(locations),
+            'defaults': tuple(
+                (station['location'], station['code'], station['sequence'])
+                for station in stations if station['active']
+            ),
+        }
+
+    @api.model
+    def _normalize_text(self, text):
+        """Texto en minúsculas, sin acentos ni separadores repetidos"""
+        text = unicodedata.normalize('NFKD', text or '')
+        text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+        return ' '.join(text.replace('_', ' ').replace('.', ' ').split())
+
+    @api.model
+    def _match_station(self, text):
+        """Resolver una ubicación en texto libre a (id de estación, zona).
+
+        Primero busca un código de estación (ej. "b-03"), luego el nombre de
+        una ubicación contenido en el texto. Para ubicaciones con varias
+        estaciones solo se resuelve la zona común.
+        """
+        station_map = self._get_station_map()
+        normalized = self._normalize_text(text)
+        if not normalized:
+            return False, False
+        for token in normalized.replace(',', ' ').replace('/', ' ').split():
+            code = station_map['normalized_codes'].get(token)
+            if code:
+                return station_map['id_by_code'][code], station_map['zone_by_code'][code]
+        for normalized_location, location in station_map['normalized_locations']:
+            if normalized_location and normalized_location in normalized:
+                codes = station_map['codes_by_location'][location]
+                zones = {station_map['zone_by_code'][code] for code in codes}
+                station_id = station_map['id_by_code'][codes[0]] if len(codes) == 1 else False
+                return station_id, zones.pop() if len(zones) == 1 else False
+        return False, False
+
+    @api.model
+    def _cron_update_consumption_trends(self, weeks=26):
+        """Actualizar la tendencia de consumo de cada estación sobre las últimas semanas"""
+        if np is None:
+            _logger.warning("numpy no está instalado: no se actualizan las tendencias de consumo de trampas")
+            return
+        today = fields.Date.context_today(self)
+        heatmap = self.env['quality.control.pest.control.line'].get_consumption_heatmap(
+            today - timedelta(weeks=weeks), today
+        )
+        trends = dict(zip(heatmap['stations'], heatmap['trends']))
+        for station in self.search([]):
+            trend = trends.get(station.code, {'slope': 0.0, 'rising': False})
+            if (station.consumption_slope, station.consumption_rising) != (trend['slope'], trend['rising']):
+                station.write({
+                    'consumption_slope': trend['slope'],
+                    'consumption_rising': trend['rising'],
+                })
+
+    @api.model
+    def _get_like_pattern(self, normalized):
+        """Patrón =ilike que cubre todo texto cuya forma normalizada contiene este término.
+
+        Las letras que pueden venir de una letra acentuada y los separadores
+        normalizados se vuelven comodines; el filtro exacto se hace después.
+        """
+        pattern = ''.join(
+            '%' if char == ' ' else '_' if char in 'aeiouncy' else '\\' + char if char in '%_\\' else char
+            for char in normalized
+        )
+        return '%%%s%%' % pattern
+
+    def _get_matching_details(self):
+        """Hallazgos asignados a estas estaciones o que _match_station resolvería por su código o ubicación"""
+        codes = {self._normalize_text(station.code) for station in self} - {''}
+        locations = {self._normalize_text(station.location) for station in self} - {''}
+        leaves = [('station_id', 'in', self.ids)] + [
+            ('location', '=ilike', self._get_like_pattern(term)) for term in codes | locations
+        ]
+        # Prefiltro en SQL y coincidencia exacta con las mismas claves normalizadas que _match_station
+        candidates = self.env['quality.control.pest.control.detail'].with_context(active_test=False).search_fetch(
+            ['|'] * (len(leaves) - 1) + leaves, ['location', 'station_id']
+        )
+
+        def matches(detail):
+            if detail.station_id.id in self.ids:
+                return True
+            normalized = self._normalize_text(detail.location)
+            tokens = set(normalized.replace(',', ' ').replace('/', ' ').split())
+            return bool(tokens & codes) or any(location in normalized for location in locations)
+
+        return candidates.filtered(matches)
+
+    @api.model
+    def _recompute_details(self, details):
+        """Volver a resolver la estación y zona de estos hallazgos y actualizar sus focos"""
+        details = details.exists()
+        if not details:
+            return
+        Detail = self.env['quality.control.pest.control.detail']
+        self.env.add_to_compute(Detail._fields['station_id'], details)
+        self.env.add_to_compute(Detail._fields['zone'], details)
+        details.flush_recordset(['station_id', 'zone'])
+        self.env['quality.control.pest.hotspot']._refresh_periods(details.mapped('control_date'))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()
+        self._recompute_details(records._get_matching_details())
+        return records
+
+    def write(self, vals):
+        matching = {'location', 'code', 'zone', 'active'} & set(vals)
+        details = self._get_matching_details() if matching else None
+        res = super().write(vals)
+        if {'location', 'code', 'zone', 'sequence', 'active'} & set(vals):
+            self.env.registry.clear_cache()
+        if matching:
+            self._recompute_details(details | self._get_matching_details())
+        return res
+
+    def unlink(self):
+        details = self._get_matching_details()
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        self._recompute_details(details)
+        return res
\ No newline at end of file
@@ -6,7 +6,9 @@ from datetime import datetime
 class QualityControlCleaningRoom(models.Model):
     _name = 'quality.control.cleaning.room'
     _description = 'Control de Limpieza de Cuarto Refrigerado y Pallets'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['quality.control.audit.mixin', 'mail.thread', 'mail.activity.mixin',
+                'quality.control.compliance.mixin', 'quality.control.report.cache.mixin',
+                'quality.control.archive.mixin', 'quality.control.text.search.mixin']
     _order = 'control_date desc'
 
     name = fields.Char(
@@ -74,6 +76,20 @@ class QualityControlCleaningRoom(models.Model):
     
     notes = fields.Text(string='Observaciones Generales')
     
+    _compliance_trigger_fields = {
+        'name', 'state', 'control_date', 'responsible_id', 'supervisor_id',
+        'is_compliant', 'attention_required',
+    }
+    
+    def _prepare_compliance_values(self):
+        return {
+            'date': self.control_date,
+            'responsible_id': self.responsible_id.id,
+            'supervisor_id': self.supervisor_id.id,
+            'state': self.state,
+            'is_compliant': self.is_compliant and not self.attention_required,
+        }
+    
     def action_start_control(self):
         """Start the quality control process"""
         self.state = 'in_progress'
@@ -102,7 +118,9 @@ class QualityControlCleaningRoom(models.Model):
 class QualityControlVegetablePalletCleaning(models.Model):
     _name = 'quality.control.vegetable.pallet.cleaning'
     _description = 'Control de Limpieza de Palets de Verdura'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['quality.control.audit.mixin', 'mail.thread', 'mail.activity.mixin',
+                'quality.control.compliance.mixin', 'quality.control.report.cache.mixin',
+                'quality.control.archive.mixin', 'quality.control.text.search.mixin']
     _order = 'control_date desc'
 
     name = fields.Char(
@@ -170,6 +188,20 @@ class QualityControlVegetablePalletCleaning(models.Model):
     
     notes = fields.Text(string='Observaciones Generales')
     
+    _compliance_trigger_fields = {
+        'name', 'state', 'control_date', 'responsible_id', 'supervisor_id',
+        'is_compliant', 'attention_required',
+    }
+    
+    def _prepare_compliance_values(self):
+        return {
+            'date': self.control_date,
+            'responsible_id': self.responsible_id.id,
+            'supervisor_id': self.supervisor_id.id,
+            'state': self.state,
+            'is_compliant': self.is_compliant and not self.attention_required,
+        }
+    
     def action_start_control(self):
         """Start the quality control process"""
         self.state = 'in_progress'
@@ -199,7 +231,9 @@ class QualityControlVegetablePalletCleaning(models.Model):
 class QualityControlPediluviosCleaning(models.Model):
     _name = 'quality.control.pediluvios.cleaning'
     _description = 'Control y Aplicación de Sterbac para Pediluvios'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['quality.control.audit.mixin', 'mail.thread', 'mail.activity.mixin',
+                'quality.control.compliance.mixin', 'quality.control.report.cache.mixin',
+                'quality.control.archive.mixin', 'quality.control.text.search.mixin']
     _order = 'control_date desc'
 
     name = fields.Char(
@@ -269,6 +303,20 @@ class QualityControlPediluviosCleaning(models.Model):
     
     notes = fields.Text(string='Observaciones Generales')
     
+    _compliance_trigger_fields = {
+        'name', 'state', 'control_date', 'responsible_id', 'supervisor_id',
+        'deshidratado_pediluvio', 'cocina_pediluvio',
+    }
+    
+    def _prepare_compliance_values(self):
+        return {
+            'date': self.control_date,
+            'responsible_id': self.responsible_id.id,
+            'supervisor_id': self.supervisor_id.id,
+            'state': self.state,
+            'is_compliant': self.deshidratado_pediluvio and self.cocina_pediluvio,
+        }
+    
     def action_start_control(self):
         """Start the quality control process"""
         self.state = 'in_progress'
@@ -1,12 +1,23 @@
 from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
-from datetime import datetime
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import create_index
+from .reception_daily_summary import ROLLUP_TRIGGER_FIELDS
+from datetime import datetime, timedelta
+from markupsafe import Markup
+
+# Campos que alteran la merma/rendimiento o el grupo de la carta de control
+SPC_FIELDS = {
+    'supplier_id', 'product_type', 'reception_date',
+    'pre_wash_weight', 'post_wash_weight',
+}
 
 
 class QualityControlRawMaterialReception(models.Model):
     _name = 'quality.control.raw.material.reception'
     _description = 'Control de Recepción de Materia Prima'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['quality.control.audit.mixin', 'mail.thread', 'mail.activity.mixin',
+                'quality.control.compliance.mixin', 'quality.control.report.cache.mixin',
+                'quality.control.archive.mixin', 'quality.control.text.search.mixin']
     _order = 'reception_date desc'
 
     name = fields.Char(
@@ -22,6 +33,7 @@ class QualityControlRawMaterialReception(models.Model):
         string='Fecha de Recepción',
         default=fields.Date.context_today,
         required=True,
+        index=True,
         tracking=True
     )
     
@@ -35,12 +47,14 @@ class QualityControlRawMaterialReception(models.Model):
         string='Proveedor',
         domain=[('supplier_rank', '>', 0)],
         required=True,
+        index=True,
         tracking=True
     )
     
     lot_number = fields.Char(
         string='Número de Lote',
         required=True,
+        index='trigram',
         tracking=True
     )
     
@@ -265,6 +279,13 @@ class QualityControlRawMaterialReception(models.Model):
                 record.waste_percentage = 0
                 record.yield_percentage = 0
     
+    spc_out_of_control = fields.Boolean(
+        string='Fuera de Control (SPC)',
+        copy=False,
+        readonly=True,
+        help='Punto fuera de los límites de la carta de control EWMA del proveedor y tipo de producto'
+    )
+    
     # SECCIÓN 7: ALMACENAMIENTO REFRIGERADO
     storage_temperature = fields.Float(
         string='Temperatura de Almacenamiento (°C)',
@@ -272,7 +293,15 @@ class QualityControlRawMaterialReception(models.Model):
     )
     
     storage_location = fields.Char(
-        string='Ubicación de Almacenamiento'
+        string='Ubicación de Almacenamiento',
+        index='btree_not_null'
+    )
+    
+    storage_probe_id = fields.Many2one(
+        'quality.control.temperature.probe',
+        string='Sonda de Almacenamiento',
+        compute='_compute_storage_probe',
+        help='Sonda de cuarto frío cuya ubicación coincide con la ubicación de almacenamiento'
     )
     
     fifo_applied = fields.Boolean(
@@ -281,12 +310,19 @@ class QualityControlRawMaterialReception(models.Model):
         help='First In, First Out'
     )
     
+    storage_responsible_id = fields.Many2one(
+        'res.users',
+        string='Responsable de Almacenamiento',
+        tracking=True,
+        help='Recibe las alertas de vencimiento. Si está vacío se usa el encargado de recepción'
+    )
+    
     # SECCIÓN 8: VIDA ÚTIL
     shelf_life_days = fields.Integer(
         string='Vida Útil (días)',
         compute='_compute_shelf_life',
         store=True,
-        help='Calculado según tipo de producto y si fue lavado'
+        help='Calculado según las reglas de vida útil por tipo de producto, lavado y proveedor'
     )
     
     expiry_date = fields.Date(
@@ -295,24 +331,69 @@ class QualityControlRawMaterialReception(models.Model):
         store=True
     )
     
-    @api.depends('product_type', 'washing_required', 'reception_date')
+    expiry_alert_date = fields.Date(
+        string='Vencimiento Alertado',
+        copy=False,
+        readonly=True,
+        help='Fecha de vencimiento para la que ya se generó una alerta'
+    )
+    
+    expiring_soon = fields.Boolean(
+        string='Próximo a Vencer',
+        compute='_compute_expiring_soon',
+        search='_search_expiring_soon',
+        help='Almacenado y con vencimiento dentro del horizonte de alerta configurado'
+    )
+    
+    shelf_life_outdated = fields.Boolean(
+        string='Vida Útil por Recalcular',
+        copy=False,
+        readonly=True,
+        help='Marcado cuando cambia una regla de vida útil; el recálculo se hace en segundo plano'
+    )
+    
+    @api.depends('product_type', 'washing_required', 'supplier_id')
     def _compute_shelf_life(self):
-        shelf_life_map = {
-            'tubérculos': {'washed': 15, 'unwashed': 37},  # Promedio 10-20 lavados, 30-45 sin lavar
-            'hoja': {'washed': 6, 'unwashed': 6},  # 5-7 días
-            'crucíferas': {'washed': 10, 'unwashed': 10},  # 8-12 días
-            'granos': {'washed': 0, 'unwashed': 270},  # 6-12 meses (no lavar)
-            'legumbres': {'washed': 7, 'unwashed': 7},  # 5-10 días
-            'frutas': {'washed': 30, 'unwashed': 30},  # Variable según fruta
-        }
-        
+        Rule = self.env['quality.control.shelf.life.rule']
         for record in self:
             if record.product_type:
-                wash_status = 'washed' if record.washing_required else 'unwashed'
-                record.shelf_life_days = shelf_life_map.get(record.product_type, {}).get(wash_status, 0)
+                record.shelf_life_days = Rule._get_shelf_life_days(
+                    record.product_type, record.washing_required, record.supplier_id.id
+                )
             else:
                 record.shelf_life_days = 0
     
+    @api.depends('storage_location')
+    def _compute_storage_probe(self):
+        locations = {location.strip().lower() for location in self.mapped('storage_location') if location and location.strip()}
+        probes = {}
+        if locations:
+            for probe in self.env['quality.control.temperature.probe'].search([
+                ('probe_type', '=', 'cold_room'), ('storage_location', '!=', False),
+            ]):
+                probes.setdefault(probe.storage_location.strip().lower(), probe)
+        for record in self:
+            record.storage_probe_id = probes.get((record.storage_location or '').strip().lower(), False)
+    
+    def action_view_storage_temperature(self):
+        """Temperaturas por hora del cuarto frío mientras el lote estuvo almacenado"""
+        self.ensure_one()
+        if not self.storage_probe_id:
+            raise UserError(_('No hay una sonda de temperatura para la ubicación de almacenamiento de esta recepción'))
+        date_to = (self.expiry_date or fields.Date.context_today(self)) + timedelta(days=1)
+        return {
+            'name': _('Temperatura de Almacenamiento - %s') % self.name,
+            'type': 'ir.actions.act_window',
+            'res_model': 'quality.control.temperature.rollup',
+            'view_mode': 'graph,pivot,tree',
+            'domain': [
+                ('probe_id', '=', self.storage_probe_id.id),
+                ('bucket', '>=', fields.Datetime.to_datetime(self.reception_date)),
+                ('bucket', '<', fields.Datetime.to_datetime(date_to)),
+            ],
+            'context': {'search_default_hour': 1},
+        }
+    
     @api.depends('reception_date', 'shelf_life_days')
     def _compute_expiry_date(self):
         from datetime import timedelta
@@ -373,6 +454,229 @@ class QualityControlRawMaterialReception(models.Model):
     
     notes = fields.Text(string='Observaciones Generales')
     
+    _archive_date_field = 'reception_date'
+    _responsible_field = 'reception_responsible_id'
+    _text_search_fields = {'name': 'A', 'lot_number': 'A', 'quality_observations': 'B', 'notes': 'B'}
+
+    def init(self):
+        """Índices compuestos para consultas de trazabilidad y retiro de producto"""
+        super().init()
+        create_index(
+            self._cr, 'quality_control_raw_material_reception_lot_date_index',
+            self._table, ['lot_number', 'reception_date'],
+        )
+        create_index(
+            self._cr, 'quality_control_raw_material_reception_supplier_date_index',
+            self._table, ['supplier_id', 'reception_date'],
+        )
+        create_index(
+            self._cr, 'quality_control_raw_material_reception_expiry_state_index',
+            self._table, ['expiry_date', 'state'],
+        )
+        create_index(
+            self._cr, 'quality_control_raw_material_reception_outdated_index',
+            self._table, ['id'], where='shelf_life_outdated IS TRUE',
+        )
+    
+    def _get_search_indexes(self):
+        return super()._get_search_indexes() + [
+            ('date_decision', ['reception_date', 'quality_decision'], ''),
+        ]
+    
+    _compliance_trigger_fields = {
+        'name', 'state', 'reception_date', 'reception_responsible_id', 'supervisor_id', 'quality_decision',
+    }
+    
+    def _prepare_compliance_values(self):
+        return {
+            'date': self.reception_date,
+            'responsible_id': self.reception_responsible_id.id,
+            'supervisor_id': self.supervisor_id.id,
+            'state': self.state,
+            'is_compliant': self.quality_decision != 'rejected',
+        }
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._mark_spc_charts()
+        self.env['quality.control.reception.daily.summary']._apply_delta(records, 1)
+        return records
+    
+    def write(self, vals):
+        Summary = self.env['quality.control.reception.daily.summary']
+        spc_changed = bool(SPC_FIELDS & set(vals))
+        rollup_changed = bool(ROLLUP_TRIGGER_FIELDS & set(vals))
+        if spc_changed:
+            self._mark_spc_charts()
+        if rollup_changed:
+            Summary._apply_delta(self, -1)
+        res = super().write(vals)
+        if spc_changed:
+            self._mark_spc_charts()
+        if rollup_changed:
+            Summary._apply_delta(self, 1)
+        return res
+    
+    def unlink(self):
+        self.env['quality.control.reception.daily.summary']._apply_delta(self, -1)
+        return super().unlink()
+    
+    def _mark_spc_charts(self):
+        """Marcar para recálculo las cartas SPC de los grupos de estas recepciones"""
+        self.env['quality.control.spc.chart']._mark_for_update(
+            {(record.supplier_id.id, record.product_type) for record in self}
+        )
+    
+    # Trazabilidad de lotes
+    @api.model
+    def _get_trace_domain(self, lot_number=None, supplier_id=None, date_from=None, date_to=None):
+        """Construir el dominio de búsqueda para una consulta de trazabilidad"""
+        if not lot_number and not supplier_id:
+            raise ValidationError(_("Debe indicar un número de lote o un proveedor"))
+        domain = []
+        if lot_number:
+            domain.append(('lot_number', 'ilike', lot_number))
+        if supplier_id:
+            domain.append(('supplier_id', '=', supplier_id))
+        if date_from:
+            domain.append(('reception_date', '>=', date_from))
+        if date_to:
+            domain.append(('reception_date', '<=', date_to))
+        return domain
+    
+    @api.model
+    def get_lot_trace(self, lot_number=None, supplier_id=None, date_from=None, date_to=None):
+        """Trazabilidad completa de un lote o proveedor para un retiro de producto.
+
+        Devuelve las recepciones encontradas (con proveedor, almacenamiento y
+        vencimiento) y los hallazgos de plagas registrados en el mismo periodo.
+        Cada sección se resuelve con una sola consulta indexada e incluye los
+        controles archivados.
+        """
+        self = self.with_context(active_test=False)
+        receptions = self.search_read(
+            self._get_trace_domain(lot_number, supplier_id, date_from, date_to),
+            ['name', 'lot_number', 'supplier_id', 'product_type', 'reception_date',
+             'net_weight', 'quality_decision', 'storage_location', 'storage_temperature',
+             'expiry_date', 'state'],
+            order='reception_date, id',
+        )
+        result = {
+            'receptions': receptions,
+            'storage': {},
+            'pest_lines': [],
+            'pest_findings': [],
+        }
+        if not receptions:
+            return result
+        
+        for reception in receptions:
+            location = reception['storage_location'] or _('Sin ubicación')
+            result['storage'].setdefault(location, []).append(reception['id'])
+        
+        period_from = date_from or min(r['reception_date'] for r in receptions)
+        period_to = date_to or max(r['expiry_date'] or r['reception_date'] for r in receptions)
+        result['pest_lines'] = self.env['quality.control.pest.control.line'].search_read(
+            [('control_date', '>=', period_from),
+             ('control_date', '<=', period_to),
+             '|', ('trap_consumption', '!=', 'sc'), ('cleanliness_ok', '=', False)],
+            ['pest_control_id', 'location', 'code', 'trap_consumption', 'cleanliness_ok', 'observations'],
+        )
+        result['pest_findings'] = self.env['quality.control.pest.control.detail'].search_read(
+            [('control_date', '>=', period_from), ('control_date', '<=', period_to)],
+            ['name', 'control_date', 'pest_type', 'location', 'finding_type', 'action_taken', 'state'],
+            order='control_date, id',
+        )
+        return result
+    
+    # Alertas de vencimiento
+    @api.model
+    def _get_expiry_alert_days(self):
+        """Horizonte en días para alertar vencimientos (parámetro del sistema)"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'kani_factory_quality_control.expiry_alert_days', 3
+        ))
+    
+    def _compute_expiring_soon(self):
+        horizon = fields.Date.context_today(self) + timedelta(days=self._get_expiry_alert_days())
+        for record in self:
+            record.expiring_soon = record.state == 'storage' and bool(record.expiry_date) and record.expiry_date <= horizon
+    
+    def _search_expiring_soon(self, operator, value):
+        # Mismo horizonte que el cron de alertas (parámetro del sistema)
+        horizon = fields.Date.context_today(self) + timedelta(days=self._get_expiry_alert_days())
+        domain = [('state', '=', 'storage'), ('expiry_date', '<=', horizon)]
+        if (operator == '=') == bool(value):
+            return domain
+        return ['!', '&'] + domain
+    
+    @api.model
+    def _cron_check_expiry(self):
+        """Alertar lotes almacenados próximos a vencer.
+
+        Solo procesa recepciones nuevas o cuya fecha de vencimiento cambió
+        desde la última alerta. Cada lote recibe su propia actividad, asignada
+        al responsable de almacenamiento; el responsable las ve agrupadas en
+        su bandeja de actividades de recepciones.
+        """
+        horizon = fields.Date.context_today(self) + timedelta(days=self._get_expiry_alert_days())
+        self.flush_model(['expiry_date', 'expiry_alert_date', 'state'])
+        self.env.cr.execute("""
+            SELECT id
+              FROM quality_control_raw_material_reception
+             WHERE state = 'storage'
+               AND expiry_date <= %s
+               AND expiry_alert_date IS DISTINCT FROM expiry_date
+          ORDER BY expiry_date, id
+        """, [horizon])
+        receptions = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if not receptions:
+            return
+        
+        activity_type = self.env['quality.control.recurring.task']._get_custom_activity_type()
+        res_model_id = self.env['ir.model']._get(self._name).id
+        # Markup escapa los valores interpolados: lote, número y ubicación los capturan los usuarios
+        self.env['mail.activity'].create([{
+            'activity_type_id': activity_type.id,
+            'summary': _('Lote %s próximo a vencer') % (lot.lot_number or lot.name),
+            'note': Markup('<p>%s - %s (%s): %s</p>') % (
+                lot.lot_number, lot.name, lot.storage_location or _('Sin ubicación'),
+                lot.expiry_date.strftime('%d/%m/%Y'),
+            ),
+            'date_deadline': lot.expiry_date,
+            'user_id': (lot.storage_responsible_id or lot.reception_responsible_id).id,
+            'res_model_id': res_model_id,
+            'res_id': lot.id,
+        } for lot in receptions])
+        
+        self.env.cr.execute("""
+            UPDATE quality_control_raw_material_reception
+               SET expiry_alert_date = expiry_date
+             WHERE id IN %s
+        """, [tuple(receptions.ids)])
+        receptions.invalidate_recordset(['expiry_alert_date'])
+    
+    @api.model
+    def _cron_recompute_shelf_life(self, batch_size=1000):
+        """Recalcular por lotes la vida útil de las recepciones afectadas por un cambio de reglas"""
+        # Las recepciones archivadas también se marcan y deben recalcularse
+        self = self.with_context(active_test=False)
+        records = self.search([('shelf_life_outdated', '=', True)], limit=batch_size, order='id')
+        if not records:
+            return
+        self.env.add_to_compute(self._fields['shelf_life_days'], records)
+        self.env.add_to_compute(self._fields['expiry_date'], records)
+        records.flush_recordset()
+        self.env.cr.execute("""
+            UPDATE quality_control_raw_material_reception
+               SET shelf_life_outdated = FALSE
+             WHERE id IN %s
+        """, [tuple(records.ids)])
+        records.invalidate_recordset(['shelf_life_outdated'])
+        if self.search_count([('shelf_life_outdated', '=', True)], limit=1):
+            self.env.ref('kani_factory_quality_control.cron_recompute_shelf_life')._trigger()
+    
     # Métodos de workflow
     def action_start_reception(self):
         """Iniciar proceso de recepción"""
@@ -0,0 +1,94 @@
+from odoo import models, api
+
+
+MULTIPLE_REPORT = 'kani_factory_quality_control.report_quality_control_raw_material_reception_multiple_template'
+
+
+class ReportRawMaterialReceptionMultiple(models.AbstractModel):
+    _name = 'report.kani_factory_quality_control.report_quality_control_raw_material_reception_multiple_template'
+    _description = 'Reporte Múltiple de Recepción de Materia Prima'
+
+    @api.model
+    def _get_summary(self, reception_ids):
+        """Totales y resumen por proveedor calculados en SQL, sin cargar las recepciones"""
+        Reception = self.env['quality.control.raw.material.reception']
+        Reception.flush_model([
+            'reception_date', 'supplier_id', 'net_weight', 'quality_decision',
+            'washing_required', 'waste_percentage', 'yield_percentage',
+        ])
+        ids = tuple(reception_ids) or (0,)
+        self.env.cr.execute("""
+            SELECT COUNT(*),
+                   MIN(reception_date),
+                   MAX(reception_date),
+                   COALESCE(SUM(net_weight), 0),
+                   COUNT(*) FILTER (WHERE quality_decision = 'approved'),
+                   COUNT(*) FILTER (WHERE quality_decision = 'approved_observations'),
+                   COUNT(*) FILTER (WHERE quality_decision = 'rejected'),
+                   COUNT(*) FILTER (WHERE washing_required),
+                   COALESCE(SUM(waste_percentage) FILTER (WHERE washing_required), 0),
+                   COALESCE(SUM(yield_percentage) FILTER (WHERE washing_required), 0)
+              FROM quality_control_raw_material_reception
+             WHERE id IN %s
+        """, [ids])
+        count, date_from, date_to, net_weight, approved, observations, rejected, washed, waste, yield_ = \
+            self.env.cr.fetchone()
+        self.env.cr.execute("""
+            SELECT partner.name,
+                   COUNT(*),
+                   COALESCE(SUM(reception.net_weight), 0),
+                   COUNT(*) FILTER (WHERE reception.quality_decision = 'approved'),
+                   COUNT(*) FILTER (WHERE reception.quality_decision = 'approved_observations'),
+                   COUNT(*) FILTER (WHERE reception.quality_decision = 'rejected')
+              FROM quality_control_raw_material_reception AS reception
+         LEFT JOIN res_partner AS partner ON partner.id = reception.supplier_id
+             WHERE reception.id IN %s
+          GROUP BY partner.id, partner.name
+          ORDER BY partner.name
+        """, [ids])
+        suppliers = [{
+            'name': name or '',
+            'count': supplier_count,
+            'net_weight': supplier_weight,
+            'approved': supplier_approved,
+            'observations': supplier_observations,
+            'rejected': supplier_rejected,
+            'quality_rate': supplier_approved / supplier_count * 100 if supplier_count else 0,
+        } for name, supplier_count, supplier_weight, supplier_approved, supplier_observations, supplier_rejected
+            in self.env.cr.fetchall()]
+
+        def rate(value):
+            return value / count * 100 if count else 0
+
+        return {
+            'count': count,
+            'date_from': date_from,
+            'date_to': date_to,
+            'net_weight': net_weight,
+            'approved': approved,
+            'approved_rate': rate(approved),
+            'observations': observations,
+            'observations_rate': rate(observations),
+            'rejected': rejected,
+            'rejected_rate': rate(rejected),
+            'washed': washed,
+            'washed_rate': rate(washed),
+            'avg_waste': waste / washed if washed else 0,
+            'avg_yield': yield_ / washed if washed else 0,
+            'suppliers': suppliers,
+        }
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        data = data or {}
+        docs = self.env['quality.control.raw.material.reception'].browse(docids)
+        chunk_count = data.get('chunk_count', 1)
+        chunk_index = data.get('chunk_index', 0)
+        return {
+            'doc_ids': docids,
+            'doc_model': 'quality.control.raw.material.reception',
+            'docs': docs,
+            'summary': data.get('summary') or self._get_summary(docids),
+            'is_first_chunk': chunk_index == 0,
+            'is_last_chunk': chunk_index == chunk_count - 1,
+        }
\ No newline at end of file
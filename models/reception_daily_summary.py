@@ -0,0 +1,115 @@
+from odoo import models, fields, api, _
+from odoo.tools import create_unique_index
+
+
+# Campos de la recepción que alimentan el resumen diario
+ROLLUP_FIELDS = [
+    'reception_date', 'supplier_id', 'product_type', 'quality_decision',
+    'gross_weight', 'net_weight', 'pre_wash_weight', 'post_wash_weight',
+]
+
+# Campos cuya escritura cambia la contribución de una recepción (net_weight depende del empaque)
+ROLLUP_TRIGGER_FIELDS = set(ROLLUP_FIELDS) | {'packaging_weight'}
+
+
+class QualityControlReceptionDailySummary(models.Model):
+    _name = 'quality.control.reception.daily.summary'
+    _description = 'Resumen Diario de Recepción de Materia Prima'
+    _order = 'date desc, supplier_id, product_type'
+
+    date = fields.Date(string='Fecha', required=True, readonly=True, index=True)
+
+    supplier_id = fields.Many2one(
+        'res.partner',
+        string='Proveedor',
+        readonly=True,
+        ondelete='cascade'
+    )
+
+    product_type = fields.Selection(
+        selection=lambda self: self.env['quality.control.raw.material.reception']._fields['product_type'].selection,
+        string='Tipo de Producto',
+        readonly=True
+    )
+
+    quality_decision = fields.Selection(
+        selection=lambda self: self.env['quality.control.raw.material.reception']._fields['quality_decision'].selection,
+        string='Decisión de Calidad',
+        readonly=True
+    )
+
+    reception_count = fields.Integer(string='Recepciones', readonly=True, group_operator='sum')
+    gross_weight = fields.Float(string='Peso Bruto (libras)', digits=(12, 2), readonly=True)
+    net_weight = fields.Float(string='Peso Neto (libras)', digits=(12, 2), readonly=True)
+    pre_wash_weight = fields.Float(string='Peso Pre-Lavado (libras)', digits=(12, 2), readonly=True)
+    post_wash_weight = fields.Float(string='Peso Post-Lavado (libras)', digits=(12, 2), readonly=True)
+
+    def init(self):
+        # Clave del resumen; COALESCE para que los valores vacíos también colisionen en ON CONFLICT
+        create_unique_index(
+            self._cr, 'quality_control_reception_daily_summary_key_index', self._table,
+            ['date', 'COALESCE(supplier_id, 0)', "COALESCE(product_type, '')", "COALESCE(quality_decision, '')"],
+        )
+
+    _upsert_query = """
+        INSERT INTO quality_control_reception_daily_summary
+               (date, supplier_id, product_type, quality_decision, reception_count,
+                gross_weight, net_weight, pre_wash_weight, post_wash_weight)
+        SELECT reception_date, supplier_id, product_type, quality_decision,
+               %(sign)s * COUNT(*),
+               %(sign)s * COALESCE(SUM(gross_weight), 0),
+               %(sign)s * COALESCE(SUM(net_weight), 0),
+               %(sign)s * COALESCE(SUM(pre_wash_weight), 0),
+               %(sign)s * COALESCE(SUM(post_wash_weight), 0)
+          FROM quality_control_raw_material_reception
+         WHERE {where}
+      GROUP BY reception_date, supplier_id, product_type, quality_decision
+        ON CONFLICT (date, COALESCE(supplier_id, 0), COALESCE(product_type, ''), COALESCE(quality_decision, ''))
+        DO UPDATE SET
+               reception_count = quality_control_reception_daily_summary.reception_count + EXCLUDED.reception_count,
+               gross_weight = quality_control_reception_daily_summary.gross_weight + EXCLUDED.gross_weight,
+               net_weight = quality_control_reception_daily_summary.net_weight + EXCLUDED.net_weight,
+               pre_wash_weight = quality_control_reception_daily_summary.pre_wash_weight + EXCLUDED.pre_wash_weight,
+               post_wash_weight = quality_control_reception_daily_summary.post_wash_weight + EXCLUDED.post_wash_weight
+    """
+
+    @api.model
+    def _apply_delta(self, receptions, sign):
+        """Sumar (sign=1) o restar (sign=-1) la contribución de estas recepciones al resumen"""
+        if not receptions.ids:
+            return
+        receptions.flush_recordset(ROLLUP_FIELDS)
+        self.env.cr.execute(
+            self._upsert_query.format(where='id IN %(ids)s') + ' RETURNING id, reception_count',
+            {'sign': sign, 'ids': tuple(receptions.ids)},
+        )
+        # Solo las filas tocadas por este delta pueden haber quedado vacías
+        emptied = tuple(summary_id for summary_id, count in self.env.cr.fetchall() if count <= 0)
+        if emptied:
+            self.env.cr.execute("""
+                DELETE FROM quality_control_reception_daily_summary
+                 WHERE id IN %s AND reception_count <= 0
+            """, [emptied])
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild(self):
+        """Reconstruir el resumen completo a partir de las recepciones"""
+        self.env['quality.control.raw.material.reception'].flush_model(ROLLUP_FIELDS)
+        self.env.cr.execute("DELETE FROM quality_control_reception_daily_summary")
+        self.env.cr.execute(self._upsert_query.format(where='TRUE'), {'sign': 1})
+        self.invalidate_model()
+        return True
+
+    def action_rebuild(self):
+        self._rebuild()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Resumen Reconstruido'),
+                'message': _('El resumen diario de recepciones se reconstruyó correctamente.'),
+                'type': 'success',
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            }
+        }
\ No newline at end of file
@@ -0,0 +1,118 @@
+import logging
+import time
+import tracemalloc
+
+from odoo import models, api, _
+from odoo.exceptions import UserError
+
+from .audit_log import BULK_ENTRY_CONTEXT_KEY
+from .compliance_fact import COMPLIANCE_MODELS
+
+_logger = logging.getLogger(__name__)
+
+
+# Tamaños de selección medidos por defecto para cada reporte
+BENCHMARK_SIZES = (1, 100, 1000, 10000)
+
+# Los datos sintéticos se crean en modo de carga masiva: sin seguimiento ni mensajes de chatter
+BENCHMARK_CONTEXT = {BULK_ENTRY_CONTEXT_KEY: 'Benchmark de Reportes'}
+
+
+class QualityControlReportBenchmark(models.AbstractModel):
+    _name = 'quality.control.report.benchmark'
+    _description = 'Benchmark de Renderizado de Reportes de Calidad'
+
+    @api.model
+    def _prepare_benchmark_values(self, model_name, count, supplier):
+        """Valores mínimos válidos para crear `count` controles sintéticos del modelo"""
+        user_id = self.env.user.id
+        if model_name == 'quality.control.raw.material.reception':
+            product_type = self.env[model_name]._fields['product_type'].selection[0][0]
+            return [{
+                'supplier_id': supplier.id,
+                'lot_number': 'BENCH-%05d' % index,
+                'product_type': product_type,
+                'reception_responsible_id': user_id,
+                'supervisor_id': user_id,
+            } for index in range(count)]
+        return [{'responsible_id': user_id, 'supervisor_id': user_id} for _index in range(count)]
+
+    @api.model
+    def _seed_benchmark_records(self, count):
+        """Crear `count` controles sintéticos por cada modelo de control"""
+        supplier = self.env['res.partner'].create({'name': 'Proveedor Benchmark', 'supplier_rank': 1})
+        return {
+            model_name: self.env[model_name].with_context(**BENCHMARK_CONTEXT).create(
+                self._prepare_benchmark_values(model_name, count, supplier)
+            ).ids
+            for model_name, _label in COMPLIANCE_MODELS
+        }
+
+    @api.model
+    def _measure_render(self, report, res_ids):
+        """Tiempo, consultas SQL y memoria pico de la etapa QWeb/HTML (sin wkhtmltopdf)"""
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            self.env['ir.actions.report']._render_qweb_html(report, res_ids)
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            'seconds': time.perf_counter() - started,
+            'queries': self.env.cr.sql_log_count - queries,
+            'peak_memory_kb': peak / 1024,
+        }
+
+    @api.model
+    def _run_benchmark(self, sizes=BENCHMARK_SIZES, max_queries_per_record=0.05):
+        """Medir cómo escala el renderizado HTML de cada reporte del módulo con la selección.
+
+        Crea datos sintéticos dentro de un savepoint que siempre se revierte y
+        devuelve una fila de resultados por reporte y tamaño. Si el número de
+        consultas de un reporte crece con la cantidad de registros (más de
+        `max_queries_per_record` consultas adicionales por registro entre el
+        tamaño menor y el mayor), se lanza un error señalando el N+1.
+
+        Uso: ``env['quality.control.report.benchmark']._run_benchmark()`` desde
+        ``odoo-bin shell``. El trazado de memoria añade un costo constante al
+        tiempo medido, por lo que los tiempos sirven para comparar tamaños, no
+        como valores absolutos.
+        """
+        sizes = sorted(sizes)
+        reports = self.env['ir.actions.report'].search([
+            ('report_name', '=like', 'kani_factory_quality_control.%'),
+            ('report_type', '=', 'qweb-pdf'),
+        ])
+        results = []
+        savepoint = self.env.cr.savepoint(flush=False)
+        try:
+            seeded = self._seed_benchmark_records(sizes[-1])
+            self.env.flush_all()
+            for report in reports:
+                for size in sizes:
+                    measure = self._measure_render(report, seeded[report.model][:size])
+                    results.append(dict(measure, report=report.report_name, records=size))
+                    _logger.info(
+                        "Benchmark %s: %s registros en %.2fs, %s consultas, %.0f KB pico",
+                        report.report_name, size, measure['seconds'], measure['queries'], measure['peak_memory_kb'],
+                    )
+        finally:
+            savepoint.close(rollback=True)
+            self.env.invalidate_all()
+
+        regressions = []
+        for report in reports:
+            rows = [row for row in results if row['report'] == report.report_name]
+            first, last = rows[0], rows[-1]
+            if last['records'] > first['records']:
+                growth = (last['queries'] - first['queries']) / (last['records'] - first['records'])
+                if growth > max_queries_per_record:
+                    regressions.append('%s: %s → %s consultas (%s → %s registros)' % (
+                        report.report_name, first['queries'], last['queries'], first['records'], last['records'],
+                    ))
+        if regressions:
+            raise UserError(_('Consultas N+1 detectadas en los reportes:\n%s') % '\n'.join(regressions))
+        return results
\ No newline at end of file
@@ -0,0 +1,67 @@
+from odoo import models
+
+from .compliance_fact import FINAL_STATES
+
+
+# Prefijo de los adjuntos PDF cacheados por los reportes individuales
+REPORT_CACHE_PREFIX = 'PDF_Cache_'
+
+
+class QualityControlReportCacheMixin(models.AbstractModel):
+    _name = 'quality.control.report.cache.mixin'
+    _description = 'Caché de PDF para Controles Cerrados'
+
+    def _get_report_cache_name(self):
+        """Nombre del adjunto PDF cacheado, ligado al control y a su write_date.
+
+        Solo los controles en un estado final se cachean; para el resto se
+        devuelve False y el reporte se renderiza siempre.
+        """
+        self.ensure_one()
+        if self.state not in FINAL_STATES:
+            return False
+        return '%s%s_%s.pdf' % (
+            REPORT_CACHE_PREFIX,
+            (self.name or str(self.id)).replace('/', '_'),
+            self.write_date.strftime('%Y%m%d%H%M%S%f'),
+        )
+
+    def _clear_report_cache(self):
+        """Eliminar los PDF cacheados de estos controles"""
+        if not self:
+            return
+        self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('name', '=like', REPORT_CACHE_PREFIX + '%'),
+        ]).unlink()
+
+    def _rename_report_cache(self):
+        """Volver a ligar los PDF cacheados de estos controles a su write_date actual"""
+        if not self:
+            return
+        attachments = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('name', '=like', REPORT_CACHE_PREFIX + '%'),
+        ])
+        for attachment in attachments:
+            name = self.browse(attachment.res_id)._get_report_cache_name()
+            if name and attachment.name != name:
+                attachment.name = name
+
+    def write(self, vals):
+        if set(vals) == {'active'}:
+            # Archivar no cambia el contenido del PDF: se conserva y se renombra con el nuevo write_date
+            res = super().write(vals)
+            self._rename_report_cache()
+            return res
+        # Cualquier otra escritura cambia el control, por lo que el PDF cacheado queda obsoleto
+        cached = self.filtered(lambda r: r.state in FINAL_STATES)
+        res = super().write(vals)
+        cached._clear_report_cache()
+        return res
+
+    def unlink(self):
+        self._clear_report_cache()
+        return super().unlink()
\ No newline at end of file
@@ -0,0 +1,131 @@
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError
+from odoo.tools import create_unique_index
+
+
+class QualityControlShelfLifeRule(models.Model):
+    _name = 'quality.control.shelf.life.rule'
+    _description = 'Regla de Vida Útil por Tipo de Producto'
+    _order = 'product_type, washed, supplier_id'
+
+    product_type = fields.Selection(
+        selection=lambda self: self.env['quality.control.raw.material.reception']._fields['product_type'].selection,
+        string='Tipo de Producto',
+        required=True
+    )
+
+    washed = fields.Boolean(
+        string='Lavado',
+        default=False,
+        help='Activado = regla para producto lavado, Desactivado = sin lavar'
+    )
+
+    days = fields.Integer(
+        string='Vida Útil (días)',
+        required=True
+    )
+
+    supplier_id = fields.Many2one(
+        'res.partner',
+        string='Proveedor',
+        domain=[('supplier_rank', '>', 0)],
+        ondelete='cascade',
+        help='Opcional: la regla solo aplica a este proveedor y tiene prioridad sobre la regla general'
+    )
+
+    active = fields.Boolean(
+        string='Activo',
+        default=True
+    )
+
+    notes = fields.Char(string='Observaciones')
+
+    def init(self):
+        """Una sola regla por clave; COALESCE para que la regla general (sin proveedor) también sea única"""
+        super().init()
+        create_unique_index(
+            self._cr, 'quality_control_shelf_life_rule_key_index',
+            self._table, ['product_type', 'washed', 'COALESCE(supplier_id, 0)'],
+        )
+
+    @api.constrains('product_type', 'washed', 'supplier_id')
+    def _check_unique_rule(self):
+        for record in self:
+            if self.with_context(active_test=False).search_count([
+                ('id', '!=', record.id),
+                ('product_type', '=', record.product_type),
+                ('washed', '=', record.washed),
+                ('supplier_id', '=', record.supplier_id.id),
+            ]):
+                raise ValidationError(_('Ya existe una regla para este tipo de producto, lavado y proveedor!'))
+
+    @api.constrains('days')
+    def _check_days(self):
+        for record in self:
+            if record.days < 0:
+                raise ValidationError(_('La vida útil no puede ser negativa'))
+
+    @api.model
+    @tools.ormcache()
+    def _get_rule_map(self):
+        """Mapa (tipo de producto, lavado, proveedor) -> días, cacheado en el registro"""
+        rules = self.sudo().search_read([], ['product_type', 'washed', 'supplier_id', 'days'])
+        return {
+            (rule['product_type'], rule['washed'], rule['supplier_id'] and rule['supplier_id'][0]): rule['days']
+            for rule in rules
+        }
+
+    @api.model
+    def _get_shelf_life_days(self, product_type, washed, supplier_id=False):
+        """Días de vida útil, priorizando la regla específica del proveedor"""
+        rule_map = self._get_rule_map()
+        if supplier_id and (product_type, washed, supplier_id) in rule_map:
+            return rule_map[(product_type, washed, supplier_id)]
+        return rule_map.get((product_type, washed, False), 0)
+
+    def _get_rule_keys(self):
+        return {(rule.product_type, rule.washed, rule.supplier_id.id) for rule in self}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self._invalidate_shelf_life(records._get_rule_keys())
+        return records
+
+    def write(self, vals):
+        keys = self._get_rule_keys()
+        res = super().write(vals)
+        self._invalidate_shelf_life(keys | self._get_rule_keys())
+        return res
+
+    def unlink(self):
+        keys = self._get_rule_keys()
+        res = super().unlink()
+        self._invalidate_shelf_life(keys)
+        return res
+
+    @api.model
+    def _invalidate_shelf_life(self, keys):
+        """Limpiar la caché y marcar solo las recepciones afectadas para recálculo en segundo plano"""
+        self.env.registry.clear_cache()
+        if not keys:
+            return
+        Reception = self.env['quality.control.raw.material.reception']
+        Reception.flush_model(['product_type', 'washing_required', 'supplier_id'])
+        for product_type, washed, supplier_id in keys:
+            query = """
+                UPDATE quality_control_raw_material_reception
+                   SET shelf_life_outdated = TRUE
+                 WHERE product_type = %s
+                   AND COALESCE(washing_required, FALSE) = %s
+                   AND shelf_life_outdated IS NOT TRUE
+            """
+            params = [product_type, washed]
+            if supplier_id:
+                query += " AND supplier_id = %s"
+                params.append(supplier_id)
+            self.env.cr.execute(query, params)
+        Reception.invalidate_model(['shelf_life_outdated'])
+        cron = self.env.ref('kani_factory_quality_control.cron_recompute_shelf_life', raise_if_not_found=False)
+        if cron:
+            cron._trigger()
\ No newline at end of file
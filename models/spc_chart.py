@@ -0,0 +1,265 @@
+import logging
+import math
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError, ValidationError
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    _logger.debug("numpy no está instalado: las cartas de control SPC no estarán disponibles")
+
+
+# Constante d2 para rangos móviles de 2 observaciones
+D2_MOVING_RANGE = 1.128
+
+
+class QualityControlSpcChart(models.Model):
+    _name = 'quality.control.spc.chart'
+    _description = 'Carta de Control EWMA de Merma y Rendimiento'
+    _order = 'supplier_id, product_type, metric'
+
+    supplier_id = fields.Many2one(
+        'res.partner',
+        string='Proveedor',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+
+    product_type = fields.Selection(
+        selection=lambda self: self.env['quality.control.raw.material.reception']._fields['product_type'].selection,
+        string='Tipo de Producto',
+        required=True
+    )
+
+    metric = fields.Selection([
+        ('waste_percentage', '% Merma'),
+        ('yield_percentage', '% Rendimiento'),
+    ], string='Métrica', required=True)
+
+    # Parámetros de la carta
+    window_size = fields.Integer(
+        string='Ventana (recepciones)',
+        default=50,
+        help='Número de recepciones más recientes usadas para calcular los límites'
+    )
+
+    ewma_lambda = fields.Float(
+        string='Lambda EWMA',
+        default=0.2,
+        digits=(3, 2),
+        help='Peso de la observación más reciente (0 < λ ≤ 1)'
+    )
+
+    sigma_multiplier = fields.Float(
+        string='Ancho de Límites (L)',
+        default=3.0,
+        digits=(3, 2)
+    )
+
+    # Resultados cacheados
+    sample_count = fields.Integer(string='Muestras', readonly=True)
+    center_line = fields.Float(string='Línea Central', digits=(5, 4), readonly=True)
+    sigma = fields.Float(string='Sigma', digits=(5, 4), readonly=True)
+    upper_control_limit = fields.Float(string='LCS', digits=(5, 4), readonly=True)
+    lower_control_limit = fields.Float(string='LCI', digits=(5, 4), readonly=True)
+    last_ewma = fields.Float(string='Último EWMA', digits=(5, 4), readonly=True)
+    out_of_control_count = fields.Integer(string='Puntos Fuera de Control', readonly=True)
+    last_point_date = fields.Date(string='Última Recepción', readonly=True)
+    last_computed = fields.Datetime(string='Último Cálculo', readonly=True)
+    is_out_of_control = fields.Boolean(
+        string='Fuera de Control',
+        readonly=True,
+        help='El último punto de la carta está fuera de los límites'
+    )
+
+    needs_update = fields.Boolean(
+        string='Pendiente de Recalcular',
+        default=True,
+        readonly=True,
+        index=True
+    )
+
+    _sql_constraints = [
+        ('unique_chart', 'unique(supplier_id, product_type, metric)',
+         'Ya existe una carta de control para este proveedor, producto y métrica!'),
+    ]
+
+    @api.constrains('window_size', 'ewma_lambda', 'sigma_multiplier')
+    def _check_parameters(self):
+        for record in self:
+            if record.window_size < 2 or record.window_size > 1000:
+                raise ValidationError(_('La ventana debe estar entre 2 y 1000 recepciones'))
+            if record.ewma_lambda <= 0 or record.ewma_lambda > 1:
+                raise ValidationError(_('Lambda debe estar entre 0 y 1'))
+            if record.sigma_multiplier <= 0:
+                raise ValidationError(_('El ancho de los límites debe ser positivo'))
+            # Los pesos (1-λ)^-t del cálculo vectorizado deben caber en un float64
+            if record.ewma_lambda < 1 and record.window_size * -math.log10(1 - record.ewma_lambda) > 300:
+                raise ValidationError(_('La ventana es demasiado grande para el valor de lambda seleccionado'))
+
+    def write(self, vals):
+        if {'window_size', 'ewma_lambda', 'sigma_multiplier'} & set(vals):
+            vals = dict(vals, needs_update=True)
+        return super().write(vals)
+
+    @api.model
+    def _mark_for_update(self, keys):
+        """Marcar (o crear) las cartas de los grupos (proveedor, tipo de producto) modificados"""
+        keys = {(supplier_id, product_type) for supplier_id, product_type in keys if supplier_id and product_type}
+        if not keys:
+            return
+        charts = self.sudo().search([
+            ('supplier_id', 'in', list({key[0] for key in keys})),
+            ('product_type', 'in', list({key[1] for key in keys})),
+        ])
+        # Filtrar sobre el recordset sudo: los usuarios solo tienen lectura sobre las cartas
+        charts = charts.filtered(lambda c: (c.supplier_id.id, c.product_type) in keys)
+        existing = {(chart.supplier_id.id, chart.product_type, chart.metric) for chart in charts}
+        charts.filtered(lambda c: not c.needs_update).write({'needs_update': True})
+        metrics = [value for value, _label in self._fields['metric'].selection]
+        self.sudo().create([
+            {'supplier_id': supplier_id, 'product_type': product_type, 'metric': metric}
+            for supplier_id, product_type in keys
+            for metric in metrics
+            if (supplier_id, product_type, metric) not in existing
+        ])
+
+    @api.model
+    def _ewma_chart(self, values, ewma_lambda, sigma_multiplier):
+        """Carta EWMA vectorizada sobre una serie ordenada cronológicamente.
+
+        Sigma se estima con el rango móvil promedio (MR/d2). Devuelve
+        (línea central, sigma, ewma, límite superior, límite inferior) donde
+        ewma y los límites son arreglos con un valor por observación.
+        """
+        x = np.asarray(values, dtype=float)
+        center = x.mean()
+        sigma = np.abs(np.diff(x)).mean() / D2_MOVING_RANGE if x.size > 1 else 0.0
+        decay = 1.0 - ewma_lambda
+        steps = np.arange(1, x.size + 1)
+        # z_t = (1-λ)^t · z_0 + λ · Σ (1-λ)^(t-j) · x_j, con z_0 = línea central
+        if decay:
+            weights = decay ** -steps
+            ewma = decay ** steps * (center + ewma_lambda * np.cumsum(x * weights))
+        else:
+            ewma = x.copy()
+        width = sigma_multiplier * sigma * np.sqrt(
+            ewma_lambda / (2 - ewma_lambda) * (1 - decay ** (2 * steps))
+        )
+        return center, sigma, ewma, center + width, center - width
+
+    def _fetch_series(self):
+        """Obtener en una sola consulta columnar la ventana de cada grupo de estas cartas"""
+        Reception = self.env['quality.control.raw.material.reception']
+        Reception.flush_model([
+            'supplier_id', 'product_type', 'reception_date',
+            'pre_wash_weight', 'post_wash_weight', 'waste_percentage', 'yield_percentage',
+        ])
+        groups = tuple({(chart.supplier_id.id, chart.product_type) for chart in self})
+        window = max(self.mapped('window_size'))
+        self.env.cr.execute("""
+            SELECT supplier_id, product_type, id, reception_date, waste_percentage, yield_percentage
+              FROM (
+                    SELECT supplier_id, product_type, id, reception_date, waste_percentage, yield_percentage,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY supplier_id, product_type
+                               ORDER BY reception_date DESC, id DESC
+                           ) AS position
+                      FROM quality_control_raw_material_reception
+                     WHERE (supplier_id, product_type) IN %s
+                       AND pre_wash_weight > 0
+                       AND post_wash_weight > 0
+                   ) AS windowed
+             WHERE position <= %s
+          ORDER BY supplier_id, product_type, reception_date, id
+        """, [groups, window])
+        series = {}
+        for supplier_id, product_type, reception_id, reception_date, waste, yield_ in self.env.cr.fetchall():
+            group = series.setdefault((supplier_id, product_type), {
+                'ids': [], 'dates': [], 'waste_percentage': [], 'yield_percentage': [],
+            })
+            group['ids'].append(reception_id)
+            group['dates'].append(reception_date)
+            group['waste_percentage'].append(waste)
+            group['yield_percentage'].append(yield_)
+        return series
+
+    def _compute_limits(self):
+        """Recalcular límites y puntos fuera de control para estas cartas"""
+        if np is None:
+            raise UserError(_("Se requiere la librería de Python 'numpy' para calcular las cartas de control"))
+        if not self:
+            return
+        series = self._fetch_series()
+        now = fields.Datetime.now()
+        window_ids = set()
+        flagged_ids = set()
+        for chart in self:
+            group = series.get((chart.supplier_id.id, chart.product_type))
+            values = group and group[chart.metric][-chart.window_size:]
+            if not values:
+                chart.write({
+                    'sample_count': 0,
+                    'out_of_control_count': 0,
+                    'is_out_of_control': False,
+                    'last_computed': now,
+                    'needs_update': False,
+                })
+                continue
+            ids = group['ids'][-chart.window_size:]
+            center, sigma, ewma, ucl, lcl = self._ewma_chart(values, chart.ewma_lambda, chart.sigma_multiplier)
+            out = (ewma > ucl) | (ewma < lcl) if sigma else np.zeros(len(values), dtype=bool)
+            window_ids.update(ids)
+            flagged_ids.update(np.asarray(ids)[out].tolist())
+            chart.write({
+                'sample_count': len(values),
+                'center_line': center,
+                'sigma': sigma,
+                'upper_control_limit': ucl[-1],
+                'lower_control_limit': lcl[-1],
+                'last_ewma': ewma[-1],
+                'out_of_control_count': int(out.sum()),
+                'is_out_of_control': bool(out[-1]),
+                'last_point_date': group['dates'][-1],
+                'last_computed': now,
+                'needs_update': False,
+            })
+        if window_ids:
+            self.env.cr.execute("""
+                UPDATE quality_control_raw_material_reception
+                   SET spc_out_of_control = id IN %s
+                 WHERE id IN %s
+            """, [tuple(flagged_ids) or (0,), tuple(window_ids)])
+            self.env['quality.control.raw.material.reception'].invalidate_model(['spc_out_of_control'])
+
+    @api.model
+    def _cron_update_charts(self):
+        """Recalcular solo las cartas cuyos grupos recibieron recepciones nuevas o modificadas"""
+        if np is None:
+            _logger.warning("numpy no está instalado: no se actualizan las cartas de control SPC")
+            return
+        self.search([('needs_update', '=', True)])._compute_limits()
+
+    def action_recompute(self):
+        self._compute_limits()
+        return True
+
+    def action_view_out_of_control(self):
+        """Ver las recepciones fuera de control de esta carta"""
+        self.ensure_one()
+        return {
+            'name': _('Recepciones Fuera de Control'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'quality.control.raw.material.reception',
+            'view_mode': 'tree,form',
+            'domain': [
+                ('supplier_id', '=', self.supplier_id.id),
+                ('product_type', '=', self.product_type),
+                ('spc_out_of_control', '=', True),
+            ],
+        }
\ No newline at end of file
@@ -0,0 +1,495 @@
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+
+from dateutil.relativedelta import relativedelta
+from markupsafe import Markup
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import create_unique_index
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    _logger.debug("numpy no está instalado: la detección de excursiones de temperatura no estará disponible")
+
+
+# Lecturas crudas: tabla particionada por mes fuera del ORM (los tableros solo leen los rollups)
+READING_TABLE = 'quality_control_temperature_reading'
+
+# Niveles de agregación, en el formato de date_trunc de PostgreSQL
+ROLLUP_GRANULARITIES = ['minute', 'hour', 'day']
+
+PROBE_INGEST_MAX_BATCH = 10000
+
+# Clave del bloqueo transaccional que serializa la creación de particiones
+PROBE_PARTITION_LOCK = 0x4B50524F
+
+# Segundos que el detector de excursiones espera antes de leer una lectura ingresada: debe
+# superar la duración de una petición de ingesta, para que ningún lote siga sin confirmar
+EXCURSION_INGEST_LAG = 120
+
+
+def _parse_reading_date(value):
+    """Fecha de una lectura (ISO 8601 o segundos epoch) como datetime UTC sin zona"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+    if not isinstance(value, str):
+        raise ValueError(value)
+    date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if date.tzinfo:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
+class QualityControlTemperatureProbe(models.Model):
+    _name = 'quality.control.temperature.probe'
+    _description = 'Sonda de Temperatura'
+    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _order = 'probe_type, name'
+
+    name = fields.Char(string='Nombre', required=True)
+
+    code = fields.Char(
+        string='Código',
+        required=True,
+        help='Identificador que envía la sonda o su pasarela en cada lectura'
+    )
+
+    probe_type = fields.Selection([
+        ('cold_room', 'Cuarto Frío'),
+        ('truck', 'Camión'),
+    ], string='Tipo de Sonda', required=True, default='cold_room')
+
+    storage_location = fields.Char(
+        string='Ubicación de Almacenamiento',
+        help='Debe coincidir con la ubicación de almacenamiento de las recepciones para enlazarlas con esta sonda'
+    )
+
+    vehicle_plate = fields.Char(string='Placa del Vehículo')
+    active = fields.Boolean(string='Activo', default=True)
+    last_reading_date = fields.Datetime(string='Última Lectura', readonly=True)
+    last_temperature = fields.Float(string='Última Temperatura (°C)', digits=(5, 2), readonly=True)
+
+    # Regla de excursión: fuera del rango durante al menos la duración indicada
+    temperature_min = fields.Float(string='Temperatura Mínima (°C)', digits=(5, 2), default=4.0)
+    temperature_max = fields.Float(string='Temperatura Máxima (°C)', digits=(5, 2), default=6.0)
+
+    excursion_minutes = fields.Integer(
+        string='Duración de Excursión (min)',
+        default=15,
+        help='Minutos continuos fuera del rango a partir de los cuales se alerta la excursión'
+    )
+
+    alert_user_id = fields.Many2one(
+        'res.users',
+        string='Responsable de Alertas',
+        help='Recibe las excursiones. Si está vacío se usa el responsable de almacenamiento de los lotes afectados'
+    )
+
+    # Estado del detector: última lectura evaluada (momento y orden de ingesta) y tramo fuera de rango abierto
+    excursion_cursor_date = fields.Datetime(string='Evaluado Hasta', readonly=True, copy=False)
+    excursion_cursor = fields.Integer(string='Cursor de Excursiones', default=0, readonly=True, copy=False)
+    excursion_start = fields.Datetime(string='Fuera de Rango Desde', readonly=True, copy=False)
+
+    excursion_activity_id = fields.Many2one(
+        'mail.activity',
+        string='Actividad de Excursión',
+        copy=False,
+        readonly=True,
+        ondelete='set null'
+    )
+
+    _sql_constraints = [
+        ('unique_code', 'unique(code)', 'Ya existe una sonda con este código!'),
+    ]
+
+    @api.constrains('temperature_min', 'temperature_max', 'excursion_minutes')
+    def _check_excursion_rule(self):
+        for record in self:
+            if record.temperature_min >= record.temperature_max:
+                raise ValidationError(_('La temperatura mínima debe ser menor que la máxima'))
+            if record.excursion_minutes < 0:
+                raise ValidationError(_('La duración de excursión no puede ser negativa'))
+
+    def init(self):
+        # Clave única (sonda, fecha): un reenvío de la pasarela no duplica lecturas ni rollups
+        self._cr.execute("""
+            CREATE TABLE IF NOT EXISTS {table} (
+                probe_id integer NOT NULL,
+                reading_date timestamp without time zone NOT NULL,
+                temperature real NOT NULL,
+                -- Orden de ingesta: el detector de excursiones avanza por estas columnas y no por
+                -- la fecha de lectura, porque las pasarelas pueden enviar lecturas atrasadas
+                seq bigserial,
+                ingested_at timestamp without time zone NOT NULL DEFAULT date_trunc('second', now() AT TIME ZONE 'UTC')
+            ) PARTITION BY RANGE (reading_date);
+
+            CREATE UNIQUE INDEX IF NOT EXISTS {table}_key_index ON {table} (probe_id, reading_date);
+            CREATE INDEX IF NOT EXISTS {table}_ingest_index ON {table} (probe_id, ingested_at, seq);
+        """.format(table=READING_TABLE))
+
+    def unlink(self):
+        if self.ids:
+            self.env.cr.execute("DELETE FROM %s WHERE probe_id IN %%s" % READING_TABLE, [tuple(self.ids)])
+        return super().unlink()
+
+    @api.model
+    def _get_probe_retention_days(self):
+        """Días que se conservan las lecturas crudas y los rollups por minuto (parámetros del sistema)"""
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        return (
+            int(get_param('kani_factory_quality_control.probe_reading_retention_days', 90)),
+            int(get_param('kani_factory_quality_control.probe_minute_rollup_retention_days', 30)),
+        )
+
+    @api.model
+    def _get_ingest_token(self):
+        return self.env['ir.config_parameter'].sudo().get_param('kani_factory_quality_control.probe_ingest_token')
+
+    @api.model
+    def _ensure_reading_partitions(self, dates):
+        """Crear las particiones mensuales que falten para estas fechas"""
+        cr = self.env.cr
+        months = {date.replace(day=1, hour=0, minute=0, second=0, microsecond=0) for date in dates}
+        for month in sorted(months):
+            partition = '%s_%s' % (READING_TABLE, month.strftime('y%Ym%m'))
+            cr.execute("SELECT to_regclass(%s)", [partition])
+            if cr.fetchone()[0]:
+                continue
+            cr.execute("SELECT pg_advisory_xact_lock(%s)", [PROBE_PARTITION_LOCK])
+            cr.execute(
+                "CREATE TABLE IF NOT EXISTS %s PARTITION OF %s FOR VALUES FROM (%%s) TO (%%s)" % (partition, READING_TABLE),
+                [month, month + relativedelta(months=1)],
+            )
+
+    @api.model
+    def _ingest_readings(self, readings):
+        """Guardar un lote de lecturas ``[{'probe', 'timestamp', 'temperature'}]`` y actualizar los rollups.
+
+        Las lecturas crudas y los rollups de minuto, hora y día se escriben en
+        una sola sentencia; las lecturas ya recibidas (misma sonda y fecha) se
+        ignoran, así que reenviar un lote es inofensivo.
+        """
+        if not isinstance(readings, list) or len(readings) > PROBE_INGEST_MAX_BATCH:
+            raise UserError(_('El lote debe ser una lista de como máximo %s lecturas') % PROBE_INGEST_MAX_BATCH)
+        codes = {reading.get('probe') for reading in readings if isinstance(reading, dict)}
+        probe_ids = {
+            probe['code']: probe['id']
+            for probe in self.search_read([('code', 'in', [code for code in codes if isinstance(code, str)])], ['code'])
+        }
+        now = fields.Datetime.now()
+        oldest = now - timedelta(days=self._get_probe_retention_days()[0])
+        newest = now + timedelta(hours=1)
+        columns = {'probe_id': [], 'reading_date': [], 'temperature': []}
+        rejected = 0
+        unknown = set()
+        for reading in readings:
+            if not isinstance(reading, dict):
+                rejected += 1
+                continue
+            if reading.get('probe') not in probe_ids:
+                unknown.add(str(reading.get('probe')))
+                rejected += 1
+                continue
+            try:
+                reading_date = _parse_reading_date(reading.get('timestamp'))
+                temperature = float(reading['temperature'])
+            except (KeyError, TypeError, ValueError, OverflowError):
+                rejected += 1
+                continue
+            # Fuera de la retención, con el reloj de la sonda adelantado o sin valor medido
+            if not oldest <= reading_date <= newest or not math.isfinite(temperature):
+                rejected += 1
+                continue
+            columns['probe_id'].append(probe_ids[reading['probe']])
+            columns['reading_date'].append(reading_date)
+            columns['temperature'].append(temperature)
+        accepted = 0
+        if columns['probe_id']:
+            self._ensure_reading_partitions(columns['reading_date'])
+            self.env.cr.execute("""
+                WITH inserted AS (
+                    INSERT INTO {table} (probe_id, reading_date, temperature)
+                    SELECT * FROM UNNEST(%s::int[], %s::timestamp[], %s::real[])
+                        ON CONFLICT DO NOTHING
+                    RETURNING probe_id, reading_date, temperature::float8 AS temperature
+                ), rolled AS (
+                    INSERT INTO quality_control_temperature_rollup AS rollup
+                           (probe_id, granularity, bucket, reading_count,
+                            temperature_min, temperature_max, temperature_sum, temperature_avg)
+                    SELECT inserted.probe_id, level.granularity, date_trunc(level.granularity, inserted.reading_date),
+                           COUNT(*), MIN(inserted.temperature), MAX(inserted.temperature),
+                           SUM(inserted.temperature), AVG(inserted.temperature)
+                      FROM inserted
+                CROSS JOIN UNNEST(%s::varchar[]) AS level(granularity)
+                  GROUP BY 1, 2, 3
+                        ON CONFLICT (probe_id, granularity, bucket) DO UPDATE SET
+                           reading_count = rollup.reading_count + EXCLUDED.reading_count,
+                           temperature_min = LEAST(rollup.temperature_min, EXCLUDED.temperature_min),
+                           temperature_max = GREATEST(rollup.temperature_max, EXCLUDED.temperature_max),
+                           temperature_sum = rollup.temperature_sum + EXCLUDED.temperature_sum,
+                           temperature_avg = (rollup.temperature_sum + EXCLUDED.temperature_sum)
+                                             / (rollup.reading_count + EXCLUDED.reading_count)
+                ), latest AS (
+                    SELECT DISTINCT ON (probe_id) probe_id, reading_date, temperature
+                      FROM inserted
+                  ORDER BY probe_id, reading_date DESC
+                ), updated AS (
+                    UPDATE quality_control_temperature_probe AS probe
+                       SET last_reading_date = latest.reading_date,
+                           last_temperature = latest.temperature
+                      FROM latest
+                     WHERE probe.id = latest.probe_id
+                       AND (probe.last_reading_date IS NULL OR probe.last_reading_date <= latest.reading_date)
+                )
+                SELECT COUNT(*) FROM inserted
+            """.format(table=READING_TABLE), [
+                columns['probe_id'], columns['reading_date'], columns['temperature'], ROLLUP_GRANULARITIES,
+            ])
+            accepted = self.env.cr.fetchone()[0]
+            self.invalidate_model(['last_reading_date', 'last_temperature'])
+            self.env['quality.control.temperature.rollup'].invalidate_model()
+            cron = self.env.ref('kani_factory_quality_control.cron_detect_temperature_excursions', raise_if_not_found=False)
+            # Sin numpy el detector no corre: no programarlo en cada ingesta
+            if accepted and cron and np is not None:
+                cron._trigger(now + timedelta(seconds=EXCURSION_INGEST_LAG))
+        return {
+            'accepted': accepted,
+            'duplicates': len(columns['probe_id']) - accepted,
+            'rejected': rejected,
+            'unknown_probes': sorted(unknown),
+        }
+
+    @api.model
+    def _cron_purge_readings(self):
+        """Eliminar las particiones de lecturas crudas y los rollups por minuto fuera de retención"""
+        reading_days, minute_days = self._get_probe_retention_days()
+        now = fields.Datetime.now()
+        cutoff = now - timedelta(days=reading_days)
+        cr = self.env.cr
+        cr.execute("""
+            SELECT child.relname
+              FROM pg_inherits
+              JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+              JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+             WHERE parent.relname = %s
+        """, [READING_TABLE])
+        for partition, in cr.fetchall():
+            month = datetime.strptime(partition[len(READING_TABLE) + 1:], 'y%Ym%m')
+            # Solo particiones completas: borrar una tabla entera no deja filas muertas
+            if month + relativedelta(months=1) <= cutoff:
+                cr.execute('DROP TABLE IF EXISTS "%s"' % partition)
+        cr.execute("""
+            DELETE FROM quality_control_temperature_rollup
+             WHERE granularity = 'minute' AND bucket < %s
+        """, [now - timedelta(days=minute_days)])
+        self.env['quality.control.temperature.rollup'].invalidate_model()
+
+    @api.model
+    def _find_excursions(self, dates, temperatures, low, high, min_duration, carry_start=None):
+        """Tramos fuera de rango de una serie ordenada, evaluados de forma vectorizada.
+
+        ``carry_start`` es el inicio del tramo que seguía abierto al final del
+        lote anterior. Devuelve (tramos sostenidos ``[(inicio, fin, mínima,
+        máxima)]``, inicio del tramo que queda abierto al final de este lote o None).
+        """
+        out = (temperatures < low) | (temperatures > high)
+        if not out.any():
+            return [], None
+        start_idx = np.flatnonzero(out & ~np.concatenate(([False], out[:-1])))
+        end_idx = np.flatnonzero(out & ~np.concatenate((out[1:], [False])))
+        starts = dates[start_idx]
+        if carry_start is not None and out[0]:
+            starts[0] = np.datetime64(carry_start, 'us')
+        sustained = dates[end_idx] - starts >= min_duration
+        # Extremos de cada tramo: reduceat abarca hasta el inicio del siguiente, las lecturas en rango son NaN
+        masked = np.where(out, temperatures, np.nan)
+        lows = np.fmin.reduceat(masked, start_idx)
+        highs = np.fmax.reduceat(masked, start_idx)
+        runs = [
+            (starts[i].item(), dates[end_idx[i]].item(), float(lows[i]), float(highs[i]))
+            for i in np.flatnonzero(sustained)
+        ]
+        return runs, starts[-1].item() if out[-1] else None
+
+    @api.model
+    def _cron_detect_excursions(self, batch_size=20000):
+        """Evaluar solo las lecturas ingresadas desde el cursor de cada sonda.
+
+        Lee en una sola consulta, por el índice (sonda, momento y orden de
+        ingesta), hasta ``batch_size`` lecturas nuevas por sonda, junto con las
+        ya evaluadas del tramo fuera de rango abierto para fusionar las lecturas
+        atrasadas; abre una única actividad por sonda ante excursiones
+        sostenidas y avanza los cursores. Si alguna sonda tenía más lecturas
+        pendientes, el cron se vuelve a programar.
+
+        Las secuencias se asignan al insertar y no al confirmar, así que el
+        cursor solo avanza hasta las lecturas ingresadas hace más de
+        ``EXCURSION_INGEST_LAG`` segundos: para entonces todo lote anterior ya
+        está confirmado y ninguna lectura queda por detrás del cursor.
+        """
+        if np is None:
+            _logger.warning("numpy no está instalado: no se detectan excursiones de temperatura")
+            return
+        probes = self.search([])
+        if not probes:
+            return
+        self.flush_model(['excursion_cursor_date', 'excursion_cursor', 'excursion_start'])
+        self.env.cr.execute("""
+            SELECT probe.id, reading.is_new, reading.ingested_at, reading.seq, reading.reading_date, reading.temperature
+              FROM quality_control_temperature_probe AS probe
+        CROSS JOIN LATERAL (
+                    (SELECT TRUE AS is_new, ingested_at, seq, reading_date, temperature
+                       FROM {table}
+                      WHERE probe_id = probe.id
+                        AND (ingested_at, seq) > (COALESCE(probe.excursion_cursor_date, '-infinity'),
+                                                  COALESCE(probe.excursion_cursor, 0))
+                        AND ingested_at <= now() AT TIME ZONE 'UTC' - make_interval(secs => %s)
+                   ORDER BY ingested_at, seq
+                      LIMIT %s)
+                  UNION ALL
+                    (SELECT FALSE, ingested_at, seq, reading_date, temperature
+                       FROM {table}
+                      WHERE probe_id = probe.id
+                        AND reading_date >= probe.excursion_start
+                        AND (ingested_at, seq) <= (probe.excursion_cursor_date, probe.excursion_cursor))
+                   ) AS reading
+             WHERE probe.id IN %s
+        """.format(table=READING_TABLE), [EXCURSION_INGEST_LAG, batch_size, tuple(probes.ids)])
+        series = {}
+        for probe_id, is_new, ingested_at, seq, reading_date, temperature in self.env.cr.fetchall():
+            data = series.setdefault(probe_id, {'new': 0, 'cursor': None, 'dates': [], 'temperatures': []})
+            if is_new:
+                data['new'] += 1
+                data['cursor'] = max(data['cursor'] or (ingested_at, seq), (ingested_at, seq))
+            data['dates'].append(reading_date)
+            data['temperatures'].append(temperature)
+        pending = False
+        for probe in probes.filtered(lambda probe: series.get(probe.id, {}).get('new')):
+            data = series[probe.id]
+            pending = pending or data['new'] >= batch_size
+            dates = np.array(data['dates'], dtype='datetime64[us]')
+            order = np.argsort(dates, kind='stable')
+            runs, open_start = self._find_excursions(
+                dates[order], np.asarray(data['temperatures'], dtype=float)[order],
+                probe.temperature_min, probe.temperature_max,
+                np.timedelta64(probe.excursion_minutes, 'm'), probe.excursion_start or None,
+            )
+            if runs:
+                probe._alert_excursion(runs)
+            probe.write({
+                'excursion_cursor_date': data['cursor'][0],
+                'excursion_cursor': data['cursor'][1],
+                'excursion_start': open_start or False,
+            })
+        if pending:
+            self.env.ref('kani_factory_quality_control.cron_detect_temperature_excursions')._trigger()
+
+    def _get_excursion_lots(self, date_from, date_to):
+        """Lotes almacenados en la ubicación de la sonda y vigentes durante la excursión"""
+        self.ensure_one()
+        Reception = self.env['quality.control.raw.material.reception']
+        location = (self.storage_location or '').strip().lower()
+        if self.probe_type != 'cold_room' or not location:
+            return Reception
+        lots = Reception.search([
+            ('state', 'in', ('storage', 'completed')),
+            ('storage_location', 'ilike', location),
+            ('reception_date', '<=', date_to),
+            ('expiry_date', '>=', date_from),
+        ], order='expiry_date, id')
+        return lots.filtered(lambda lot: lot.storage_location.strip().lower() == location)
+
+    def _alert_excursion(self, runs):
+        """Abrir la actividad de excursión de la sonda, salvo que ya tenga una abierta"""
+        self.ensure_one()
+        if self.excursion_activity_id:
+            _logger.debug("Excursión de la sonda %s ya alertada en la actividad %s", self.code, self.excursion_activity_id.id)
+            return
+        lots = self._get_excursion_lots(runs[0][0].date(), runs[-1][1].date())
+        user = (
+            self.alert_user_id or lots[:1].storage_responsible_id or lots[:1].reception_responsible_id
+            or self.env.ref('base.user_admin')
+        )
+        probe = self.with_context(tz=user.tz)
+        # Markup escapa los valores interpolados: nombres y lotes los capturan los usuarios
+        periods = Markup('').join(
+            Markup('<li>%s - %s: %.1f a %.1f °C</li>') % (
+                fields.Datetime.context_timestamp(probe, start).strftime('%d/%m/%Y %H:%M'),
+                fields.Datetime.context_timestamp(probe, end).strftime('%d/%m/%Y %H:%M'),
+                low, high,
+            )
+            for start, end, low, high in runs
+        )
+        lines = Markup('').join(
+            Markup('<li>%s - %s: %s</li>') % (lot.lot_number, lot.name, lot.expiry_date.strftime('%d/%m/%Y'))
+            for lot in lots
+        ) or Markup('<li>%s</li>') % _('Sin lotes almacenados en esta ubicación')
+        note = Markup('<p>%s</p><ul>%s</ul><p>%s</p><ul>%s</ul>') % (
+            _('Temperatura fuera de %.1f - %.1f °C por %d minutos o más:') % (
+                self.temperature_min, self.temperature_max, self.excursion_minutes,
+            ),
+            periods,
+            _('Lotes afectados:'),
+            lines,
+        )
+        self.excursion_activity_id = self.env['mail.activity'].create({
+            'activity_type_id': self.env['quality.control.recurring.task']._get_custom_activity_type().id,
+            'summary': _('Excursión de temperatura en %s') % self.name,
+            'note': note,
+            'date_deadline': fields.Date.context_today(self),
+            'user_id': user.id,
+            'res_model_id': self.env['ir.model']._get(self._name).id,
+            'res_id': self.id,
+        })
+
+    def action_view_rollups(self):
+        self.ensure_one()
+        return {
+            'name': _('Temperaturas de %s') % self.name,
+            'type': 'ir.actions.act_window',
+            'res_model': 'quality.control.temperature.rollup',
+            'view_mode': 'graph,pivot,tree',
+            'domain': [('probe_id', '=', self.id)],
+            'context': {'search_default_hour': 1},
+        }
+
+
+class QualityControlTemperatureRollup(models.Model):
+    _name = 'quality.control.temperature.rollup'
+    _description = 'Rollup de Temperatura de Sondas'
+    _order = 'bucket desc, probe_id'
+    _log_access = False
+
+    probe_id = fields.Many2one(
+        'quality.control.temperature.probe',
+        string='Sonda',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+
+    granularity = fields.Selection([
+        ('minute', 'Minuto'),
+        ('hour', 'Hora'),
+        ('day', 'Día'),
+    ], string='Nivel', required=True, readonly=True)
+
+    bucket = fields.Datetime(string='Periodo', required=True, readonly=True)
+    reading_count = fields.Integer(string='Lecturas', readonly=True, group_operator='sum')
+    temperature_min = fields.Float(string='Mínima (°C)', readonly=True, group_operator='min')
+    temperature_max = fields.Float(string='Máxima (°C)', readonly=True, group_operator='max')
+    temperature_sum = fields.Float(string='Suma (°C)', readonly=True)
+    temperature_avg = fields.Float(string='Promedio (°C)', readonly=True, group_operator='avg')
+
+    def init(self):
+        # Clave del rollup; también sirve las consultas por sonda, nivel y rango de fechas
+        create_unique_index(
+            self._cr, 'quality_control_temperature_rollup_key_index', self._table,
+            ['probe_id', 'granularity', 'bucket'],
+        )
\ No newline at end of file
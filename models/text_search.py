@@ -0,0 +1,165 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import create_index
+from odoo.tools.sql import column_exists, create_column
+
+from .compliance_fact import COMPLIANCE_MODELS
+
+
+# Configuración de PostgreSQL para la búsqueda de texto (raíces y palabras vacías en español)
+TEXT_SEARCH_CONFIG = 'spanish'
+
+# Tablas con columna de búsqueda: los controles y las líneas de control de plagas
+TEXT_SEARCH_MODELS = [model_name for model_name, _label in COMPLIANCE_MODELS] + ['quality.control.pest.control.line']
+
+
+class QualityControlTextSearchMixin(models.AbstractModel):
+    _name = 'quality.control.text.search.mixin'
+    _description = 'Búsqueda de Texto Completo en Controles'
+
+    # Campos de texto indexados y su peso en el ranking (A = más relevante)
+    _text_search_fields = {'name': 'A', 'notes': 'B'}
+    # Control al que pertenece una coincidencia: modelo (vacío = el propio) y columna con su id
+    _text_search_control_model = None
+    _text_search_control_field = 'id'
+
+    text_search = fields.Char(
+        string='Texto',
+        compute='_compute_text_search',
+        search='_search_text_search',
+        help='Búsqueda de texto completo en el número y las observaciones del control'
+    )
+
+    def init(self):
+        """Columna tsvector mantenida por trigger e índice GIN sobre ella"""
+        super().init()
+        if self._abstract:
+            return
+        cr = self._cr
+        function = '%s_search_vector' % self._table
+        body = """
+            BEGIN
+                NEW.search_vector := %s;
+                RETURN NEW;
+            END;
+        """ % self._get_search_vector_expression('NEW.')
+        cr.execute("SELECT prosrc FROM pg_proc WHERE proname = %s", [function])
+        row = cr.fetchone()
+        # Recalcular las filas existentes si la columna es nueva o cambiaron los campos indexados
+        outdated = not row or row[0] != body
+        if not column_exists(cr, self._table, 'search_vector'):
+            create_column(cr, self._table, 'search_vector', 'tsvector')
+            outdated = True
+        columns = ', '.join('"%s"' % name for name in self._text_search_fields)
+        cr.execute("""
+            CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $${body}$$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS {function} ON {table};
+            CREATE TRIGGER {function}
+                BEFORE INSERT OR UPDATE OF {columns} ON {table}
+                FOR EACH ROW EXECUTE FUNCTION {function}();
+        """.format(function=function, body=body, table=self._table, columns=columns))
+        if outdated:
+            cr.execute('UPDATE {table} SET search_vector = {expression}'.format(
+                table=self._table, expression=self._get_search_vector_expression(''),
+            ))
+        create_index(cr, '%s_search_index' % self._table, self._table, ['search_vector'], method='gin')
+
+    @api.model
+    def _get_search_vector_expression(self, prefix):
+        return ' || '.join(
+            "setweight(to_tsvector('%s', COALESCE(%s\"%s\", '')), '%s')" % (TEXT_SEARCH_CONFIG, prefix, name, weight)
+            for name, weight in self._text_search_fields.items()
+        )
+
+    @api.model
+    def _get_text_search_query(self, text):
+        """Subconsulta (modelo, id del control, ranking) de las coincidencias de esta tabla"""
+        query = """
+            SELECT %s AS res_model, {control} AS res_id, ts_rank_cd(search_vector, query) AS rank
+              FROM {table}, websearch_to_tsquery('{config}', %s) AS query
+             WHERE search_vector @@ query
+        """.format(control=self._text_search_control_field, table=self._table, config=TEXT_SEARCH_CONFIG)
+        return query, [self._text_search_control_model or self._name, text]
+
+    @api.model
+    def _execute_text_search(self, text, model_names, limit=None, offset=0):
+        """Coincidencias agrupadas por control y ordenadas por relevancia: [(modelo, id, ranking)]"""
+        queries, params = [], []
+        for model_name in model_names:
+            Model = self.env[model_name]
+            # Los triggers calculan el vector al escribir en la base: enviar lo pendiente
+            Model.flush_model(list(Model._text_search_fields))
+            query, query_params = Model._get_text_search_query(text)
+            queries.append(query)
+            params += query_params
+        if not queries:
+            return []
+        query = """
+            SELECT res_model, res_id, MAX(rank) AS rank
+              FROM ({matches}) AS matches
+          GROUP BY res_model, res_id
+          ORDER BY rank DESC, res_id DESC, res_model
+        """.format(matches=' UNION ALL '.join(queries))
+        if limit:
+            query += ' LIMIT %s OFFSET %s'
+            params += [limit, offset]
+        self.env.cr.execute(query, params)
+        return self.env.cr.fetchall()
+
+    def _compute_text_search(self):
+        self.text_search = False
+
+    def _search_text_search(self, operator, value):
+        if operator not in ('ilike', 'like', '=') or not isinstance(value, str):
+            raise UserError(_('La búsqueda de texto solo admite buscar un texto'))
+        model_names = [
+            model_name for model_name in TEXT_SEARCH_MODELS
+            if (self.env[model_name]._text_search_control_model or model_name) == self._name
+        ]
+        matches = self._execute_text_search(value, model_names)
+        return [('id', 'in', [res_id for _res_model, res_id, _rank in matches])]
+
+    @api.model
+    def search_text(self, text, limit=50):
+        """Buscar un texto en todos los controles, incluidos los archivados.
+
+        Acepta la sintaxis de búsqueda web ("hongos roedor", "moho OR hongos",
+        "-limpio") y devuelve las coincidencias que el usuario puede leer,
+        ordenadas de mayor a menor relevancia.
+        """
+        text = (text or '').strip()
+        if not text:
+            return []
+        model_names = [
+            model_name for model_name in TEXT_SEARCH_MODELS
+            if self.env[self.env[model_name]._text_search_control_model or model_name].check_access_rights(
+                'read', raise_exception=False)
+        ]
+        labels = dict(COMPLIANCE_MODELS)
+        results = []
+        offset = 0
+        # Las reglas de registro se aplican después del LIMIT: pedir más páginas hasta completarlo
+        while True:
+            matches = self._execute_text_search(text, model_names, limit=limit, offset=offset)
+            readable = {}
+            for model_name in {res_model for res_model, _res_id, _rank in matches}:
+                ids = [res_id for res_model, res_id, _rank in matches if res_model == model_name]
+                readable[model_name] = self.env[model_name].browse(ids)._filter_access_rules('read')
+            for res_model, res_id, rank in matches:
+                record = readable[res_model].browse(res_id)
+                if record not in readable[res_model]:
+                    continue
+                results.append({
+                    'res_model': res_model,
+                    'res_id': res_id,
+                    'model_label': labels.get(res_model, res_model),
+                    'name': record.name,
+                    'date': record[record._archive_date_field],
+                    'state': record.state,
+                    'active': record.active,
+                    'rank': rank,
+                })
+            if not limit or len(results) >= limit or len(matches) < limit:
+                return results[:limit or None]
+            offset += limit
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Simulador local de sondas de temperatura.
+
+Genera lecturas de cuartos fríos o camiones y las envía en lotes al endpoint
+de ingesta del módulo, igual que una pasarela real:
+
+    python scripts/probe_simulator.py --token SECRETO --probe CF-01 --probe CF-02 \
+        --minutes 240 --interval 30 --excursion 60:45:9.5
+
+Solo usa la librería estándar; no requiere Odoo instalado.
+"""
+import argparse
+import json
+import random
+import urllib.request
+from datetime import datetime, timedelta, timezone
+
+
+def generate_readings(probes, minutes, interval, base, noise, excursion=None):
+    """Lecturas de los últimos ``minutes`` minutos con ruido en paseo aleatorio.
+
+    ``excursion`` es ``(inicio, duración, temperatura)`` en minutos desde el
+    inicio de la serie: durante ese tramo las sondas leen alrededor de esa
+    temperatura, para probar la detección de excursiones.
+    """
+    end = datetime.now(timezone.utc).replace(microsecond=0)
+    start = end - timedelta(minutes=minutes)
+    readings = []
+    for probe in probes:
+        temperature = base
+        moment = start
+        while moment <= end:
+            temperature += random.uniform(-noise, noise) + (base - temperature) * 0.1
+            value = temperature
+            if excursion:
+                offset = (moment - start).total_seconds() / 60
+                if excursion[0] <= offset < excursion[0] + excursion[1]:
+                    value = excursion[2] + random.uniform(-noise, noise)
+            readings.append({
+                'probe': probe,
+                'timestamp': moment.isoformat().replace('+00:00', 'Z'),
+                'temperature': round(value, 2),
+            })
+            moment += timedelta(seconds=interval)
+    readings.sort(key=lambda reading: reading['timestamp'])
+    return readings
+
+
+def send(url, token, readings):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps({'readings': readings}).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'Authorization': 'Bearer %s' % token},
+        method='POST',
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8069/quality_control/probes/ingest')
+    parser.add_argument('--token', required=True, help='Valor de kani_factory_quality_control.probe_ingest_token')
+    parser.add_argument('--probe', action='append', required=True, help='Código de sonda (repetible)')
+    parser.add_argument('--minutes', type=int, default=60, help='Minutos de historia a generar')
+    parser.add_argument('--interval', type=int, default=30, help='Segundos entre lecturas')
+    parser.add_argument('--base', type=float, default=5.0, help='Temperatura normal (°C)')
+    parser.add_argument('--noise', type=float, default=0.3, help='Variación por lectura (°C)')
+    parser.add_argument('--batch', type=int, default=1000, help='Lecturas por petición')
+    parser.add_argument('--excursion', help='inicio:duración:temperatura, en minutos y °C')
+    args = parser.parse_args()
+
+    excursion = args.excursion and tuple(float(value) for value in args.excursion.split(':'))
+    readings = generate_readings(args.probe, args.minutes, args.interval, args.base, args.noise, excursion)
+    totals = {'accepted': 0, 'duplicates': 0, 'rejected': 0}
+    for start in range(0, len(readings), args.batch):
+        result = send(args.url, args.token, readings[start:start + args.batch])
+        for key in totals:
+            totals[key] += result.get(key, 0)
+        if result.get('unknown_probes'):
+            print('Sondas desconocidas: %s' % ', '.join(result['unknown_probes']))
+    print('Enviadas %s lecturas: %s' % (len(readings), json.dumps(totals)))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file